@@ -1,60 +1,145 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 import os
+import logging
+import json
 import secrets
+import time
+from collections import Counter
+from datetime import datetime, timedelta
 
-from models import db, User, Order, Account, encrypt_password, decrypt_password
-from auth import generate_token, token_required, admin_required
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import (db, User, Order, Account, Proxy, StripeEvent, encrypt_password, decrypt_password,
+                    get_cipher, owner_has_plan)
+from auth import generate_token, auth_required, token_required, admin_required, worker_required, current_user_record
 import stripe_api
+from stats import get_stats, invalidate_stats
+from hashing import HashingBusy
+from db_config import database_url, engine_options, configure_engines
+import job_queue
+import proxy_pool
+from progress_ingest import apply_progress_batch, IngestError
+from notifier import notifier, install as install_notifier, serialize_progress, PROGRESS_FIELDS
+from versioning import data_version, install as install_versioning
+import export
+from ratelimit import protected, LoadShedder, RATE_LIMIT_ENABLED, IP_LIMITS_ENABLED
+import import_accounts
+import bulk_ops
+import replicas
+from replicas import replica_read
+import metrics
+import log_config
 
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///warmup.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+logger = logging.getLogger(__name__)
 
-db.init_app(app)
-CORS(app)
+# Routes live on a blueprint so importing this module does no I/O: the app
+# factory only builds config. Schema creation, migrations and the default
+# admin user are handled once per deploy by bootstrap.py.
+api = Blueprint('api', __name__)
 
-with app.app_context():
-    db.create_all()
-    
-    # Auto-migration: Add encrypted_password column if it doesn't exist
-    from sqlalchemy import inspect, text
-    inspector = inspect(db.engine)
-    columns = [col['name'] for col in inspector.get_columns('accounts')]
-    
-    if 'encrypted_password' not in columns:
-        try:
-            db.session.execute(text('ALTER TABLE accounts ADD COLUMN encrypted_password TEXT'))
-            db.session.commit()
-            print("✅ Auto-migration: Added encrypted_password column")
-        except Exception as e:
-            print(f"⚠️  Migration warning: {e}")
-            db.session.rollback()
-    
-    # Auto-migration: Add email column if it doesn't exist
-    if 'email' not in columns:
-        try:
-            db.session.execute(text('ALTER TABLE accounts ADD COLUMN email VARCHAR(120)'))
-            db.session.commit()
-            print("✅ Auto-migration: Added email column")
-        except Exception as e:
-            print(f"⚠️  Migration warning: {e}")
-            db.session.rollback()
-    
-    # Create admin user if not exists
-    admin = User.query.filter_by(email='admin@warmup.ai').first()
-    if not admin:
-        admin = User(email='admin@warmup.ai', role='admin')
-        admin.set_password('admin123')
-        db.session.add(admin)
-        db.session.commit()
-        print("✅ Admin user created: admin@warmup.ai / admin123")
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 500
+
+# Progress stream: keepalive comment interval, how often to re-read the DB to
+# catch changes made by other workers, and how long before clients reconnect.
+# Each open stream holds a worker thread (or greenlet), so a worker serves at
+# most SSE_MAX_STREAMS at once and answers 503 + Retry-After beyond that,
+# leaving the rest for other routes. gunicorn.conf.py sizes it per worker class.
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RESYNC_SECONDS = int(os.getenv('SSE_RESYNC_SECONDS', '60'))
+SSE_MAX_SECONDS = int(os.getenv('SSE_MAX_SECONDS', '3600'))
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '4'))
+SSE_RETRY_AFTER_SECONDS = 30
+
+stream_slots = LoadShedder(SSE_MAX_STREAMS)
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config:
+        app.config.update(config)
+    # Fail at startup, not on the first password, when ENCRYPTION_KEY is missing or invalid
+    get_cipher()
+    # Number of reverse proxies in front of the app, so request.remote_addr
+    # (used for rate limiting) is the client rather than the proxy
+    trusted_proxies = int(os.getenv('TRUSTED_PROXIES') or '0')
+    if trusted_proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
+    if RATE_LIMIT_ENABLED and not IP_LIMITS_ENABLED:
+        logger.warning('TRUSTED_PROXIES is not set; per-IP rate limits are off until it is '
+                       '(1 behind one reverse proxy such as Railway, 0 without one)')
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config.get('DB_ENGINE_PROFILE')))
+    replicas.install(app)
+
+    db.init_app(app)
+    configure_engines(app)
+    install_notifier(db.session)
+    install_versioning(db.session)
+    metrics.install(app)
+    log_config.install(app)
+    CORS(app, expose_headers=['X-Next-Cursor', 'ETag', log_config.REQUEST_ID_HEADER])
+    app.register_blueprint(api)
+    return app
+
+@api.app_errorhandler(HashingBusy)
+def handle_hashing_busy(e):
+    response = jsonify({'error': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# PAGINATION
+def get_page_params():
+    """Read keyset pagination params: ?limit=N&after=<last id from previous page>"""
+    limit = request.args.get('limit', DEFAULT_PAGE_LIMIT, type=int)
+    limit = max(1, min(limit, MAX_PAGE_LIMIT))
+    after = request.args.get('after', type=int)
+    return limit, after
+
+def paginated_response(rows, limit):
+    """Serialize (model, user_email) rows newest first; X-Next-Cursor is set when more rows exist"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    result = []
+    for obj, user_email in rows:
+        obj_dict = obj.to_dict()
+        obj_dict['user_email'] = user_email
+        result.append(obj_dict)
+    response = jsonify(result)
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(rows[-1][0].id)
+    return response, 200
+
+# CONDITIONAL GET
+def user_etag(user_id, version=None):
+    """Weak ETag for everything a user can read; changes whenever their accounts/orders do"""
+    if version is None:
+        version = data_version(user_id)
+    return None if version is None else f'u{user_id}-v{version}'
+
+def not_modified(etag):
+    """A 304 response if the client already holds this version, else None"""
+    if etag and request.if_none_match.contains_weak(etag):
+        return with_etag(Response(status=304), etag)
+    return None
+
+def with_etag(response, etag):
+    if etag:
+        response.set_etag(etag, weak=True)
+        # Private per-user data: browsers may keep it but must revalidate
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 # AUTH
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
+@protected('register')
 def register():
     data = request.json
     email = data.get('email')
@@ -70,7 +155,8 @@ def register():
     token = generate_token(user.id, user.email, user.role)
     return jsonify({'token': token, 'user': user.to_dict()}), 201
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
+@protected('login')
 def login():
     data = request.json
     email = data.get('email')
@@ -80,26 +166,34 @@ def login():
     user = User.query.filter_by(email=email).first()
     if not user or not user.check_password(password):
         return jsonify({'error': 'Invalid credentials'}), 401
+    # Upgrade hashes made at an older BCRYPT_ROUNDS while we have the plaintext
+    if user.password_needs_rehash():
+        user.set_password(password)
+        db.session.commit()
     token = generate_token(user.id, user.email, user.role)
     return jsonify({'token': token, 'user': user.to_dict()}), 200
 
-@app.route('/api/auth/me', methods=['GET'])
+@api.route('/api/auth/me', methods=['GET'])
 @token_required
 def get_current_user(current_user):
-    user = User.query.get(current_user['user_id'])
+    etag = user_etag(current_user['user_id'])
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    user = current_user_record()
     if not user:
         return jsonify({'error': 'User not found'}), 404
-    return jsonify(user.to_dict()), 200
+    return with_etag(jsonify(user.to_dict()), etag), 200
 
 # CHECKOUT
-@app.route('/api/checkout/create', methods=['POST'])
+@api.route('/api/checkout/create', methods=['POST'])
 @token_required
 def create_checkout(current_user):
     data = request.json
     plan = data.get('plan')
     if plan not in ['one_time', 'starter', 'growth']:
         return jsonify({'error': 'Invalid plan'}), 400
-    user = User.query.get(current_user['user_id'])
+    user = current_user_record()
     try:
         session = stripe_api.create_checkout_session(
             plan=plan,
@@ -111,15 +205,16 @@ def create_checkout(current_user):
         order = Order(user_id=user.id, stripe_session_id=session.id, plan=plan, amount=amounts[plan], status='pending')
         db.session.add(order)
         db.session.commit()
-        print(f"✅ Order created: {order.id}")
+        logger.info('Order created', extra={'order_id': order.id, 'plan': plan})
         return jsonify({'session_id': session.id, 'url': session.url}), 200
+    except stripe_api.StripeUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        print(f"❌ Checkout error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Checkout failed')
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/checkout/create-guest', methods=['POST'])
+@api.route('/api/checkout/create-guest', methods=['POST'])
+@protected('create-guest')
 def create_guest_checkout():
     data = request.json
     plan = data.get('plan')
@@ -145,34 +240,48 @@ def create_guest_checkout():
         db.session.add(order)
         db.session.commit()
         return jsonify({'session_id': session.id, 'url': session.url}), 200
+    except HashingBusy:
+        raise
+    except stripe_api.StripeUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/webhook/stripe', methods=['POST'])
+@api.route('/api/webhook/stripe', methods=['POST'])
 def stripe_webhook():
     payload = request.data
     sig_header = request.headers.get('Stripe-Signature')
     event = stripe_api.verify_webhook_signature(payload, sig_header)
     if not event:
         return jsonify({'error': 'Invalid signature'}), 400
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        order = Order.query.filter_by(stripe_session_id=session['id']).first()
-        if order:
-            order.status = 'paid'
-            order.stripe_payment_id = session.get('payment_intent')
-            db.session.commit()
-            print(f"✅ Payment successful: Order {order.id}")
+    # Record the event and acknowledge right away; webhook_worker.py applies it.
+    # Redeliveries hit the unique event_id and are acknowledged as duplicates.
+    db.session.add(StripeEvent(
+        event_id=event['id'],
+        type=event['type'],
+        payload=payload.decode('utf-8'),
+        status='pending'
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'success': True, 'duplicate': True}), 200
     return jsonify({'success': True}), 200
 
 # CLIENT ROUTES
-@app.route('/api/accounts', methods=['GET'])
+@api.route('/api/accounts', methods=['GET'])
 @token_required
 def get_user_accounts(current_user):
+    # Read the version before the rows: a write in between only costs one extra 200
+    etag = user_etag(current_user['user_id'])
+    cached = not_modified(etag)
+    if cached:
+        return cached
     accounts = Account.query.filter_by(user_id=current_user['user_id']).all()
-    return jsonify([acc.to_dict() for acc in accounts]), 200
+    return with_etag(jsonify([acc.to_dict() for acc in accounts]), etag), 200
 
-@app.route('/api/accounts', methods=['POST'])
+@api.route('/api/accounts', methods=['POST'])
 @token_required
 def create_account(current_user):
     # Check if user has a paid order
@@ -204,6 +313,7 @@ def create_account(current_user):
     
     account = Account(
         user_id=current_user['user_id'], 
+        order_id=paid_order.id,
         username=username, 
         encrypted_password=encrypted_pwd,
         niche=niche, 
@@ -213,14 +323,18 @@ def create_account(current_user):
     db.session.commit()
     return jsonify(account.to_dict()), 201
 
-@app.route('/api/orders', methods=['GET'])
+@api.route('/api/orders', methods=['GET'])
 @token_required
 def get_user_orders(current_user):
+    etag = user_etag(current_user['user_id'])
+    cached = not_modified(etag)
+    if cached:
+        return cached
     orders = Order.query.filter_by(user_id=current_user['user_id']).all()
-    return jsonify([order.to_dict() for order in orders]), 200
+    return with_etag(jsonify([order.to_dict() for order in orders]), etag), 200
 
 # WARMUP CONTROL ENDPOINTS
-@app.route('/api/accounts/<int:account_id>/activate', methods=['PUT'])
+@api.route('/api/accounts/<int:account_id>/activate', methods=['PUT'])
 @token_required
 def activate_warmup(current_user, account_id):
     """Activate warmup for an account - changes status from 'ready' to 'warming'"""
@@ -240,6 +354,7 @@ def activate_warmup(current_user, account_id):
         account.started_at = datetime.utcnow()
 
     db.session.commit()
+    invalidate_stats()
 
     return jsonify({
         'success': True,
@@ -254,26 +369,36 @@ def activate_warmup(current_user, account_id):
         'account': account.to_dict()
     }), 200
 
-@app.route('/api/accounts/<int:account_id>/progress', methods=['GET'])
+@api.route('/api/accounts/<int:account_id>/progress', methods=['GET'])
 @token_required
 def get_account_progress(current_user, account_id):
     """Get detailed progress for an account"""
-    account = Account.query.get_or_404(account_id)
+    owner = db.session.execute(
+        select(Account.user_id, User.data_version).join(User, User.id == Account.user_id)
+        .where(Account.id == account_id)
+    ).first()
+    if owner is None:
+        return jsonify({'error': 'Account not found'}), 404
 
     # Verify user owns this account
-    if account.user_id != current_user['user_id'] and current_user['role'] != 'admin':
+    if owner.user_id != current_user['user_id'] and current_user['role'] != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
 
+    etag = user_etag(owner.user_id, owner.data_version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    account = db.session.get(Account, account_id)
+
     # Calculate estimated completion
     estimated_completion = None
     if account.started_at and account.status == 'warming':
         # Rough estimate: 5 days of warmup
-        from datetime import timedelta
         days_remaining = 5 - (account.current_day or 0)
         if days_remaining > 0:
-            estimated_completion = (account.started_at + timedelta(days=5)).isoformat()
+            estimated_completion = (account.started_at + timedelta(days=5, seconds=account.paused_seconds or 0)).isoformat()
 
-    return jsonify({
+    return with_etag(jsonify({
         'id': account.id,
         'username': account.username,
         'status': account.status,
@@ -285,9 +410,98 @@ def get_account_progress(current_user, account_id):
         'started_at': account.started_at.isoformat() if account.started_at else None,
         'completed_at': account.completed_at.isoformat() if account.completed_at else None,
         'estimated_completion': estimated_completion
-    }), 200
+    }), etag), 200
+
+def progress_snapshot(user_id):
+    """Progress fields for all of a user's accounts, keyed by account id"""
+    columns = [getattr(Account, field) for field in PROGRESS_FIELDS]
+    rows = db.session.execute(select(Account.id, *columns).where(Account.user_id == user_id)).all()
+    # Streams are long-lived; don't hold a pooled connection between reads
+    db.session.remove()
+    return {row.id: serialize_progress(row._asdict()) for row in rows}
+
+def sse_event(name, data, event_id):
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data)}\n\n"
+
+@api.route('/api/accounts/stream', methods=['GET'])
+@auth_required(allow_query_token=True)
+def stream_account_progress(current_user):
+    """Server-Sent Events feed of progress deltas for all of the user's accounts.
+
+    Sends a 'snapshot' event first (or after a gap), then 'progress' events
+    with only the changed fields. Reconnecting clients send Last-Event-ID
+    (or ?last_event_id=) to resume without a new snapshot.
+    """
+    if not stream_slots.try_enter():
+        response = jsonify({'error': 'Too many open progress streams, please retry later'})
+        response.headers['Retry-After'] = str(SSE_RETRY_AFTER_SECONDS)
+        return response, 503
+    try:
+        response = progress_stream(current_user['user_id'])
+    except Exception:
+        stream_slots.leave()
+        raise
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(stream_slots.leave)
+    return response
+
+def progress_stream(user_id):
+    """The event-stream response for a user; unsubscribes when the server closes it"""
+    seq = notifier.parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    waiter = notifier.subscribe(user_id)
+    try:
+        resume = seq is not None and notifier.since(user_id, seq)[1]
+        if not resume:
+            # Take the position before reading so no change falls between the two
+            seq = notifier.current_seq()
+        known = progress_snapshot(user_id)
+    except Exception:
+        notifier.unsubscribe(user_id, waiter)
+        raise
+
+    def generate():
+        nonlocal seq, known
+        yield f"retry: 3000\n\n"
+        if not resume:
+            yield sse_event('snapshot', list(known.values()), notifier.event_id(seq))
+        started = last_sync = time.monotonic()
+        while time.monotonic() - started < SSE_MAX_SECONDS:
+            waiter.clear()
+            events, complete = notifier.since(user_id, seq)
+            if not complete:
+                seq = notifier.current_seq()
+                known = progress_snapshot(user_id)
+                yield sse_event('snapshot', list(known.values()), notifier.event_id(seq))
+                continue
+            for event_seq, data in events:
+                seq = event_seq
+                known.setdefault(data['id'], {}).update(data)
+                yield sse_event('progress', data, notifier.event_id(seq))
+            if events:
+                continue
 
-@app.route('/api/accounts/<int:account_id>/pause', methods=['PUT'])
+            if time.monotonic() - last_sync >= SSE_RESYNC_SECONDS:
+                last_sync = time.monotonic()
+                latest = progress_snapshot(user_id)
+                for account_id, values in latest.items():
+                    delta = {k: v for k, v in values.items() if known.get(account_id, {}).get(k) != v}
+                    if delta:
+                        yield sse_event('progress', dict(delta, id=account_id), notifier.event_id(seq))
+                for account_id in set(known) - set(latest):
+                    yield sse_event('progress', {'id': account_id, 'deleted': True}, notifier.event_id(seq))
+                known = latest
+
+            if not waiter.wait(SSE_HEARTBEAT_SECONDS):
+                yield ": keepalive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(lambda: notifier.unsubscribe(user_id, waiter))
+    return response
+
+@api.route('/api/accounts/<int:account_id>/pause', methods=['PUT'])
 @token_required
 def pause_warmup(current_user, account_id):
     """Pause warmup for an account - changes status from 'warming' to 'ready'"""
@@ -305,6 +519,7 @@ def pause_warmup(current_user, account_id):
     account.status = 'ready'
 
     db.session.commit()
+    invalidate_stats()
 
     return jsonify({
         'success': True,
@@ -312,36 +527,135 @@ def pause_warmup(current_user, account_id):
         'account': account.to_dict()
     }), 200
 
+# WORKER ROUTES
+@api.route('/api/worker/progress', methods=['POST'])
+@worker_required
+def ingest_progress(current_user):
+    """Apply a batch of progress reports: {"updates": [{"account_id", "reels_viewed", ..., "status"}]}"""
+    data = request.json or {}
+    try:
+        results, status_changed = apply_progress_batch(data.get('updates'))
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 400
+    if status_changed:
+        invalidate_stats()
+    applied = sum(1 for r in results if r['result'] == 'applied')
+    return jsonify({'applied': applied, 'results': results}), 200
+
+def leased_jobs_from_request():
+    jobs = (request.json or {}).get('jobs')
+    if not isinstance(jobs, list) or not all(
+            isinstance(j, dict) and isinstance(j.get('id'), int) and j.get('lease_token') for j in jobs):
+        return None
+    return jobs
+
+def int_from_request(field, default, low, high):
+    """An integer body field clamped to low..high; None when it isn't an integer"""
+    value = (request.json or {}).get(field, default)
+    if isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (ValueError, TypeError):
+        return None
+    return max(low, min(value, high))
+
+def lease_seconds_from_request():
+    return int_from_request('lease_seconds', job_queue.DEFAULT_LEASE_SECONDS, 30, 3600)
+
+@api.route('/api/worker/jobs/lease', methods=['POST'])
+@worker_required
+def lease_jobs(current_user):
+    """Claim due warmup sessions: {"worker_id", "max_jobs", "lease_seconds"}"""
+    data = request.json or {}
+    worker_id = data.get('worker_id') or f"user-{current_user['user_id']}"
+    max_jobs = int_from_request('max_jobs', 10, 1, job_queue.MAX_LEASE_BATCH)
+    lease_seconds = lease_seconds_from_request()
+    if max_jobs is None or lease_seconds is None:
+        return jsonify({'error': 'max_jobs and lease_seconds must be integers'}), 400
+    jobs = job_queue.lease_jobs(str(worker_id)[:100], max_jobs, lease_seconds)
+    return jsonify({'jobs': jobs}), 200
+
+@api.route('/api/worker/jobs/heartbeat', methods=['POST'])
+@worker_required
+def heartbeat_jobs(current_user):
+    """Extend leases: {"jobs": [{"id", "lease_token"}], "lease_seconds"}"""
+    jobs = leased_jobs_from_request()
+    if jobs is None:
+        return jsonify({'error': 'jobs must be a list of {id, lease_token}'}), 400
+    lease_seconds = lease_seconds_from_request()
+    if lease_seconds is None:
+        return jsonify({'error': 'lease_seconds must be an integer'}), 400
+    extended, lost = job_queue.heartbeat_jobs(jobs, lease_seconds)
+    return jsonify({'extended': extended, 'lost': lost}), 200
+
+@api.route('/api/worker/jobs/ack', methods=['POST'])
+@worker_required
+def ack_jobs(current_user):
+    """Finish leased jobs: {"jobs": [{"id", "lease_token", "success", "error"}]}"""
+    jobs = leased_jobs_from_request()
+    if jobs is None:
+        return jsonify({'error': 'jobs must be a list of {id, lease_token}'}), 400
+    acked, lost = job_queue.ack_jobs(jobs)
+    return jsonify({'acked': acked, 'lost': lost}), 200
+
 # ADMIN ROUTES
-@app.route('/api/admin/users', methods=['GET'])
+@api.route('/api/admin/users', methods=['GET'])
 @admin_required
+@replica_read
 def get_all_users(current_user):
     users = User.query.all()
     return jsonify([user.to_dict() for user in users]), 200
 
-@app.route('/api/admin/orders', methods=['GET'])
+@api.route('/api/admin/orders', methods=['GET'])
 @admin_required
+@replica_read
 def get_all_orders(current_user):
-    orders = Order.query.all()
-    result = []
-    for order in orders:
-        order_dict = order.to_dict()
-        order_dict['user_email'] = order.user.email
-        result.append(order_dict)
-    return jsonify(result), 200
+    limit, after = get_page_params()
+    query = db.session.query(Order, User.email).join(User, Order.user_id == User.id)
+    for field in ('status', 'plan'):
+        if request.args.get(field):
+            query = query.filter(getattr(Order, field) == request.args[field])
+    if after:
+        query = query.filter(Order.id < after)
+    rows = query.order_by(Order.id.desc()).limit(limit + 1).all()
+    return paginated_response(rows, limit)
 
-@app.route('/api/admin/accounts', methods=['GET'])
+@api.route('/api/admin/accounts', methods=['GET'])
 @admin_required
+@replica_read
 def get_all_accounts(current_user):
-    accounts = Account.query.all()
-    result = []
-    for account in accounts:
-        account_dict = account.to_dict()
-        account_dict['user_email'] = account.user.email
-        result.append(account_dict)
-    return jsonify(result), 200
+    limit, after = get_page_params()
+    query = db.session.query(Account, User.email).join(User, Account.user_id == User.id)
+    for field in ('status', 'niche'):
+        if request.args.get(field):
+            query = query.filter(getattr(Account, field) == request.args[field])
+    if request.args.get('plan'):
+        query = query.filter(owner_has_plan(request.args['plan']))
+    if after:
+        query = query.filter(Account.id < after)
+    rows = query.order_by(Account.id.desc()).limit(limit + 1).all()
+    return paginated_response(rows, limit)
 
-@app.route('/api/admin/accounts/<int:account_id>', methods=['PATCH'])
+@api.route('/api/admin/export/<kind>', methods=['GET'])
+@admin_required
+@replica_read
+def export_table(current_user, kind):
+    """Stream every user/order/account as NDJSON (default) or ?format=csv; same filters as the listings"""
+    if kind not in export.EXPORTS:
+        return jsonify({'error': f'Unknown export: {kind}'}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    query = export.build_query(kind, request.args)
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(export.stream_rows(query, fmt)),
+        mimetype=export.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@api.route('/api/admin/accounts/<int:account_id>', methods=['PATCH'])
 @admin_required
 def update_account_status(current_user, account_id):
     account = Account.query.get(account_id)
@@ -354,12 +668,15 @@ def update_account_status(current_user, account_id):
         account.current_day = data['current_day']
     if 'progress_percentage' in data:
         account.progress_percentage = data['progress_percentage']
-    if 'proxy_id' in data:
+    if 'proxy_id' in data and data['proxy_id'] != account.proxy_id:
+        proxy_pool.release(account.proxy_id)
+        proxy_pool.claim(data['proxy_id'])
         account.proxy_id = data['proxy_id']
     db.session.commit()
+    invalidate_stats()
     return jsonify(account.to_dict()), 200
 
-@app.route('/api/admin/accounts', methods=['POST'])
+@api.route('/api/admin/accounts', methods=['POST'])
 @admin_required
 def admin_create_account(current_user):
     data = request.json
@@ -383,7 +700,61 @@ def admin_create_account(current_user):
     db.session.commit()
     return jsonify(account.to_dict()), 201
 
-@app.route('/api/admin/accounts/<int:account_id>/password', methods=['GET'])
+@api.route('/api/admin/accounts/import', methods=['POST'])
+@admin_required
+def bulk_import_accounts(current_user):
+    """Import many accounts from a JSON list / {"accounts": [...]}, a CSV body or a multipart 'file'.
+
+    ?user_id= sets the owner for rows without one; ?dry_run=1 validates only.
+    """
+    upload = request.files.get('file')
+    if upload:
+        fmt = 'json' if upload.filename.endswith('.json') else 'csv'
+        text = upload.read().decode('utf-8-sig')
+    else:
+        fmt = 'csv' if request.mimetype == 'text/csv' else 'json'
+        text = request.get_data(as_text=True)
+    try:
+        rows = import_accounts.parse_rows(text, fmt)
+        report = import_accounts.import_accounts(
+            rows,
+            default_user_id=request.args.get('user_id', type=int),
+            dry_run=request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        )
+    except import_accounts.InvalidImport as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report), 200
+
+@api.route('/api/admin/bulk', methods=['POST'])
+@admin_required
+def bulk_operation(current_user):
+    """Apply one action to many accounts/orders in one transaction (see bulk_ops.py).
+
+    {"target": "accounts", "action": "set_status", "status": "paused", "filter": {"niche": "fitness"}}
+    or with "ids": [...]; ?dry_run=1 only counts.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        result = bulk_ops.run(
+            data.get('action'),
+            data.get('target', 'accounts'),
+            ids=data.get('ids'),
+            filters=data.get('filter'),
+            status=data.get('status'),
+            proxy_id=data.get('proxy_id'),
+            dry_run=request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        )
+    except bulk_ops.InvalidBulkRequest as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except proxy_pool.NoProxyAvailable as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    return jsonify(result), 200
+
+@api.route('/api/admin/accounts/<int:account_id>/password', methods=['GET'])
 @admin_required
 def get_account_password(current_user, account_id):
     """Decrypt and return Instagram password for admin viewing"""
@@ -398,20 +769,23 @@ def get_account_password(current_user, account_id):
         decrypted_password = decrypt_password(account.encrypted_password)
         return jsonify({'password': decrypted_password}), 200
     except Exception as e:
-        print(f"Error decrypting password: {e}")
+        logger.error('Failed to decrypt password', extra={'account_id': account_id, 'error': str(e)})
         return jsonify({'error': 'Failed to decrypt password'}), 500
 
-@app.route('/api/admin/accounts/<int:account_id>', methods=['DELETE'])
+@api.route('/api/admin/accounts/<int:account_id>', methods=['DELETE'])
 @admin_required
 def delete_account(current_user, account_id):
     account = Account.query.get(account_id)
     if not account:
         return jsonify({'error': 'Account not found'}), 404
+    proxy_pool.release(account.proxy_id)
+    job_queue.delete_account_jobs([account.id])
     db.session.delete(account)
     db.session.commit()
+    invalidate_stats()
     return jsonify({'message': 'Account deleted'}), 200
 
-@app.route('/api/admin/orders/<int:order_id>', methods=['PATCH'])
+@api.route('/api/admin/orders/<int:order_id>', methods=['PATCH'])
 @admin_required
 def update_order_status(current_user, order_id):
     order = Order.query.get(order_id)
@@ -421,27 +795,116 @@ def update_order_status(current_user, order_id):
     if 'status' in data:
         order.status = data['status']
     db.session.commit()
+    invalidate_stats()
     return jsonify(order.to_dict()), 200
 
-@app.route('/api/admin/stats', methods=['GET'])
+# PROXIES
+@api.route('/api/admin/proxies', methods=['GET'])
 @admin_required
+def get_proxies(current_user):
+    proxies = Proxy.query.order_by(Proxy.id).all()
+    return jsonify([proxy.to_dict() for proxy in proxies]), 200
+
+def proxy_state_error(data):
+    """Why a proxy create/update body's capacity/healthy/draining are invalid, or None"""
+    if 'capacity' in data:
+        capacity = data['capacity']
+        if isinstance(capacity, bool) or not isinstance(capacity, (int, str)):
+            return 'capacity must be a non-negative integer'
+        try:
+            capacity = int(capacity)
+        except ValueError:
+            return 'capacity must be a non-negative integer'
+        if capacity < 0:
+            return 'capacity must be a non-negative integer'
+    for field in ('healthy', 'draining'):
+        if data.get(field) is not None and not isinstance(data[field], bool):
+            return f'{field} must be true or false'
+    return None
+
+@api.route('/api/admin/proxies', methods=['POST'])
+@admin_required
+def create_proxy(current_user):
+    data = request.get_json(silent=True) or {}
+    if not data.get('key') or not isinstance(data['key'], str):
+        return jsonify({'error': 'Proxy key required'}), 400
+    error = proxy_state_error(data)
+    if error:
+        return jsonify({'error': error}), 400
+    if Proxy.query.filter_by(key=data['key']).first():
+        return jsonify({'error': 'Proxy already exists'}), 400
+    niches = data.get('niches') or []
+    proxy = Proxy(
+        key=data['key'],
+        url=data.get('url'),
+        region=data.get('region'),
+        niches=','.join(niches) if isinstance(niches, list) else niches,
+        capacity=int(data.get('capacity', 5)),
+        assigned_count=Account.query.filter_by(proxy_id=data['key']).count()
+    )
+    db.session.add(proxy)
+    db.session.flush()
+    proxy_pool.index.load()
+    db.session.commit()
+    return jsonify(proxy.to_dict()), 201
+
+@api.route('/api/admin/proxies/<int:proxy_id>', methods=['PATCH'])
+@admin_required
+def update_proxy(current_user, proxy_id):
+    proxy = db.session.get(Proxy, proxy_id)
+    if not proxy:
+        return jsonify({'error': 'Proxy not found'}), 404
+    data = request.get_json(silent=True) or {}
+    error = proxy_state_error(data)
+    if error:
+        return jsonify({'error': error}), 400
+    proxy_pool.set_proxy_state(
+        proxy,
+        healthy=data.get('healthy'),
+        draining=data.get('draining'),
+        capacity=int(data['capacity']) if 'capacity' in data else None
+    )
+    db.session.commit()
+    return jsonify(proxy.to_dict()), 200
+
+@api.route('/api/admin/proxies/<int:proxy_id>/drain', methods=['POST'])
+@admin_required
+def drain_proxy(current_user, proxy_id):
+    """Stop assigning to a proxy and move its accounts to the least-loaded matching proxies"""
+    proxy = db.session.get(Proxy, proxy_id)
+    if not proxy:
+        return jsonify({'error': 'Proxy not found'}), 404
+    moved, unplaced = proxy_pool.drain_proxy(proxy)
+    db.session.commit()
+    return jsonify({'moved': moved, 'unplaced': unplaced, 'proxy': proxy.to_dict()}), 200
+
+@api.route('/api/admin/accounts/<int:account_id>/assign-proxy', methods=['POST'])
+@admin_required
+def assign_account_proxy(current_user, account_id):
+    account = db.session.get(Account, account_id)
+    if not account:
+        return jsonify({'error': 'Account not found'}), 404
+    try:
+        proxy_pool.assign_proxy(account, region=(request.get_json(silent=True) or {}).get('region'))
+    except proxy_pool.NoProxyAvailable as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    db.session.commit()
+    return jsonify({'account_id': account.id, 'proxy_id': account.proxy_id}), 200
+
+@api.route('/api/admin/stats', methods=['GET'])
+@admin_required
+@replica_read
 def get_admin_stats(current_user):
-    total_users = User.query.filter_by(role='client').count()
-    total_orders = Order.query.count()
-    paid_orders = Order.query.filter_by(status='paid').count()
-    total_revenue = sum([o.amount for o in Order.query.filter_by(status='paid').all()]) / 100
-    active_accounts = Account.query.filter_by(status='warming').count()
-    completed_accounts = Account.query.filter_by(status='completed').count()
-    return jsonify({
-        'total_users': total_users,
-        'total_orders': total_orders,
-        'paid_orders': paid_orders,
-        'total_revenue': total_revenue,
-        'active_accounts': active_accounts,
-        'completed_accounts': completed_accounts
-    }), 200
+    return jsonify(get_stats()), 200
+
+@api.route('/api/admin/metrics', methods=['GET'])
+@admin_required
+def get_metrics(current_user):
+    """Per-route latency/SQL/bcrypt/Stripe/size histograms for this worker, in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
-@app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
+@api.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
 @admin_required
 def delete_user(current_user, user_id):
     user = User.query.get(user_id)
@@ -449,14 +912,19 @@ def delete_user(current_user, user_id):
         return jsonify({'error': 'User not found'}), 404
     if user.role == 'admin':
         return jsonify({'error': 'Cannot delete admin users'}), 403
-    # Delete associated accounts and orders
+    # Delete associated jobs, accounts and orders, freeing the accounts' proxies
+    proxy_pool.release_many(Counter(db.session.execute(
+        select(Account.proxy_id).where(Account.user_id == user_id, Account.proxy_id.is_not(None))
+    ).scalars()))
+    job_queue.delete_account_jobs(select(Account.id).where(Account.user_id == user_id))
     Account.query.filter_by(user_id=user_id).delete()
     Order.query.filter_by(user_id=user_id).delete()
     db.session.delete(user)
     db.session.commit()
+    invalidate_stats()
     return jsonify({'message': 'User deleted'}), 200
 
-@app.route('/api/admin/orders/manual', methods=['POST'])
+@api.route('/api/admin/orders/manual', methods=['POST'])
 @admin_required
 def create_manual_order(current_user):
     data = request.json
@@ -505,9 +973,10 @@ def create_manual_order(current_user):
     )
     db.session.add(order)
     db.session.commit()
+    invalidate_stats()
     return jsonify(order.to_dict()), 201
 
-@app.route('/api/admin/change-password', methods=['POST'])
+@api.route('/api/admin/change-password', methods=['POST'])
 @admin_required
 def change_admin_password(current_user):
     data = request.json
@@ -516,14 +985,12 @@ def change_admin_password(current_user):
     if not new_password or len(new_password) < 8:
         return jsonify({'error': 'Password must be at least 8 characters'}), 400
     
-    admin = User.query.get(current_user['user_id'])
+    admin = current_user_record()
     admin.set_password(new_password)
     db.session.commit()
     return jsonify({'message': 'Password changed successfully'}), 200
 
-@app.route('/api/admin/users/create-admin', methods=['POST'])
-@admin_required
-def create_admin_user(current_user):
+def _create_staff_user(role):
     data = request.json
     email = data.get('email')
     password = data.get('password')
@@ -534,15 +1001,31 @@ def create_admin_user(current_user):
     if User.query.filter_by(email=email).first():
         return jsonify({'error': 'User already exists'}), 400
     
-    admin = User(email=email, role='admin')
-    admin.set_password(password)
-    db.session.add(admin)
+    user = User(email=email, role=role)
+    user.set_password(password)
+    db.session.add(user)
     db.session.commit()
-    return jsonify(admin.to_dict()), 201
+    return jsonify(user.to_dict()), 201
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/admin/users/create-admin', methods=['POST'])
+@admin_required
+def create_admin_user(current_user):
+    return _create_staff_user('admin')
+
+# Accounts for the warmup worker fleet: they log in like anyone else and may
+# only use the @worker_required job and progress endpoints
+@api.route('/api/admin/users/create-worker', methods=['POST'])
+@admin_required
+def create_worker_user(current_user):
+    return _create_staff_user('worker')
+
+@api.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'ok'}), 200
 
+app = create_app()
+
 if __name__ == '__main__':
+    from bootstrap import bootstrap
+    bootstrap(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,13 +1,23 @@
 import jwt
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
 
 JWT_SECRET = os.getenv('JWT_SECRET', 'your-secret-key-change-this')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Verified tokens are cached so polling clients skip the HMAC check.
+# Entries are evicted least-recently-used and expire at the token's own exp.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '4096'))
+
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 def generate_token(user_id, email, role):
     payload = {
         'user_id': user_id,
@@ -23,36 +33,77 @@ def decode_token(token):
     except:
         return None
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            try:
-                token = request.headers['Authorization'].split(' ')[1]
-            except:
-                return jsonify({'error': 'Invalid token format'}), 401
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        data = decode_token(token)
-        if not data:
-            return jsonify({'error': 'Token is invalid'}), 401
-        return f(data, *args, **kwargs)
-    return decorated
-
-def admin_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            try:
-                token = request.headers['Authorization'].split(' ')[1]
-            except:
-                return jsonify({'error': 'Invalid token format'}), 401
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        data = decode_token(token)
-        if not data or data.get('role') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        return f(data, *args, **kwargs)
-    return decorated
+def verify_token(token):
+    """Decode a token, answering repeat calls from the verified-token LRU"""
+    now = time.time()
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+        if entry is not None:
+            claims, expires = entry
+            if now < expires:
+                _token_cache.move_to_end(token)
+                return claims
+            del _token_cache[token]
+
+    claims = decode_token(token)
+    if claims is None:
+        return None
+
+    with _token_cache_lock:
+        _token_cache[token] = (claims, claims.get('exp', now))
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return claims
+
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
+
+def get_bearer_token(allow_query_token=False):
+    """Return (token, error) from the Authorization header"""
+    header = request.headers.get('Authorization')
+    if not header:
+        # EventSource can't send headers, so streams may pass ?access_token=
+        if allow_query_token and request.args.get('access_token'):
+            return request.args['access_token'], None
+        return None, 'Token is missing'
+    parts = header.split(' ')
+    if len(parts) < 2 or not parts[1]:
+        return None, 'Invalid token format'
+    return parts[1], None
+
+def current_user_record():
+    """The authenticated User row, loaded at most once per request"""
+    if 'current_user_record' not in g:
+        from models import db, User
+        claims = g.get('current_claims')
+        g.current_user_record = db.session.get(User, claims['user_id']) if claims else None
+    return g.current_user_record
+
+def auth_required(roles=None, allow_query_token=False):
+    """Require a valid bearer token, optionally with one of the given roles.
+
+    The decoded claims are passed to the view as its first argument and kept
+    on g.current_claims; use current_user_record() for the User row.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            token, error = get_bearer_token(allow_query_token)
+            if error:
+                return jsonify({'error': error}), 401
+            data = verify_token(token)
+            if roles is None:
+                if not data:
+                    return jsonify({'error': 'Token is invalid'}), 401
+            elif not data or data.get('role') not in roles:
+                required = ' or '.join(role.capitalize() for role in roles)
+                return jsonify({'error': f'{required} access required'}), 403
+            g.current_claims = data
+            return f(data, *args, **kwargs)
+        return decorated
+    return decorator
+
+token_required = auth_required()
+admin_required = auth_required(roles=('admin',))
+worker_required = auth_required(roles=('admin', 'worker'))
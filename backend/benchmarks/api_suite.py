@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+API benchmark suite: seeded database, real routes, latency / rps / SQL per request
+
+Seeds a database (benchmarks/seed.py) and then drives each endpoint in
+ENDPOINTS two ways:
+  client  sequential requests through the Flask test client (no HTTP)
+  http    --processes load-generator processes with keep-alive connections
+          against the app served by a threaded WSGI server in this process,
+          or against --server-url (e.g. a gunicorn started separately)
+
+For each endpoint and mode it reports p50/p95/p99 latency, requests per
+second, status codes and SQL statements per request (counted with engine
+events; unavailable with --server-url). Results are written as JSON, and
+--compare flags endpoints whose p95 or rps regressed against an earlier run.
+
+Usage (from backend/):
+  python benchmarks/api_suite.py --scale 10k [--url postgresql://...] [--modes client,http]
+      [--requests 500] [--processes 4] [--seconds 10] [--output api.json] [--compare baseline.json]
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import percentile  # noqa: E402
+
+# Measure the routes themselves, not the login rate limiter in front of them
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+
+# (name, method, path, auth, json body); auth is 'admin', 'client' or None
+ENDPOINTS = [
+    ('admin_accounts', 'GET', '/api/admin/accounts?limit=100', 'admin', None),
+    ('admin_accounts_by_status', 'GET', '/api/admin/accounts?status=warming&limit=100', 'admin', None),
+    ('admin_orders', 'GET', '/api/admin/orders?limit=100', 'admin', None),
+    ('admin_stats', 'GET', '/api/admin/stats', 'admin', None),
+    ('client_accounts', 'GET', '/api/accounts', 'client', None),
+    ('client_orders', 'GET', '/api/orders', 'client', None),
+    ('me', 'GET', '/api/auth/me', 'client', None),
+    ('login', 'POST', '/api/auth/login', None, 'login'),
+    ('health', 'GET', '/api/health', None, None),
+]
+REGRESSION_THRESHOLD = 0.15
+SPAWN_GRACE_SECONDS = 2.0
+
+
+def summarize(latencies, statuses, elapsed, statements=None):
+    result = {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) or 0, 3),
+        'p95_ms': round(percentile(latencies, 95) or 0, 3),
+        'p99_ms': round(percentile(latencies, 99) or 0, 3),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())}
+    }
+    if statements is not None:
+        result['sql_per_request'] = round(statements / len(latencies), 2) if latencies else None
+    return result
+
+
+class StatementCounter:
+    """Counts cursor executions on an engine (thread-safe; shared by all requests)"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def prepare(url, scale):
+    from app import create_app
+    from auth import generate_token
+    from models import db, User
+    from seed import seed, SEED_EMAIL, SEED_PASSWORD
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    first_user = seed(app, scale)
+    with app.app_context():
+        admin = User.query.filter_by(role='admin').first()
+        client = db.session.get(User, first_user)
+        tokens = {
+            'admin': generate_token(admin.id, admin.email, admin.role),
+            'client': generate_token(client.id, client.email, client.role)
+        }
+        counter = StatementCounter(db.engine)
+    bodies = {'login': {'email': SEED_EMAIL.format(0), 'password': SEED_PASSWORD}}
+    return app, tokens, bodies, counter
+
+
+def request_args(endpoint, tokens, bodies):
+    _, method, path, auth, body = endpoint
+    headers = {'Authorization': f'Bearer {tokens[auth]}'} if auth else {}
+    return method, path, headers, bodies.get(body)
+
+
+def run_client(app, tokens, bodies, counter, requests, warmup=20):
+    client = app.test_client()
+    results = {}
+    for endpoint in ENDPOINTS:
+        method, path, headers, body = request_args(endpoint, tokens, bodies)
+        for _ in range(warmup):
+            client.open(path, method=method, headers=headers, json=body)
+        latencies, statuses = [], {}
+        before = counter.count
+        start = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, headers=headers, json=body)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        results[endpoint[0]] = summarize(latencies, statuses, time.perf_counter() - start, counter.count - before)
+        print(f"  client {endpoint[0]:>26}: {json.dumps(results[endpoint[0]])}")
+    return results
+
+
+def load_worker(base_url, method, path, headers, body, start_at, deadline, queue):
+    """One load-generator process: a keep-alive connection issuing requests from start_at until deadline"""
+    time.sleep(max(0, start_at - time.time()))
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    payload = json.dumps(body) if body is not None else None
+    headers = dict(headers, **({'Content-Type': 'application/json'} if payload else {}))
+    latencies, statuses = [], {}
+    while time.time() < deadline:
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            status = 'error'
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+    conn.close()
+    queue.put((latencies, statuses))
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run_http(base_url, tokens, bodies, counter, processes, seconds):
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    for endpoint in ENDPOINTS:
+        method, path, headers, body = request_args(endpoint, tokens, bodies)
+        queue = ctx.Queue()
+        # Give every process time to spawn so they all start (and stop) together
+        start_at = time.time() + SPAWN_GRACE_SECONDS
+        workers = [ctx.Process(target=load_worker,
+                               args=(base_url, method, path, headers, body, start_at, start_at + seconds, queue))
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        time.sleep(max(0, start_at - time.time()))
+        before = counter.count if counter else None
+        samples = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        latencies = [ms for lat, _ in samples for ms in lat]
+        statuses = {}
+        for _, counts in samples:
+            for code, count in counts.items():
+                statuses[code] = statuses.get(code, 0) + count
+        statements = counter.count - before if counter else None
+        results[endpoint[0]] = summarize(latencies, statuses, seconds, statements)
+        print(f"  http   {endpoint[0]:>26}: {json.dumps(results[endpoint[0]])}")
+    return results
+
+
+def compare(results, baseline_path):
+    """Endpoints whose p95 rose or rps fell by more than REGRESSION_THRESHOLD"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for mode, endpoints in results['modes'].items():
+        for name, current in endpoints.items():
+            previous = baseline.get('modes', {}).get(mode, {}).get(name)
+            if not previous:
+                continue
+            if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + REGRESSION_THRESHOLD):
+                regressions.append(f"{mode}/{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+            if previous['rps'] and current['rps'] < previous['rps'] * (1 - REGRESSION_THRESHOLD):
+                regressions.append(f"{mode}/{name}: rps {previous['rps']} -> {current['rps']}")
+    return regressions
+
+
+def main(args):
+    from seed import parse_scale
+
+    scale = parse_scale(args.scale)
+    modes = args.modes.split(',')
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f'sqlite:///{os.path.join(tmp, "api_suite.db")}'
+        app, tokens, bodies, counter = prepare(url, scale)
+        results = {
+            'meta': {
+                'scale': scale,
+                'dialect': url.split(':', 1)[0],
+                'bcrypt_rounds': int(os.getenv('BCRYPT_ROUNDS', '12')),
+                'started_at': datetime.utcnow().isoformat(),
+                'requests': args.requests,
+                'processes': args.processes,
+                'seconds': args.seconds
+            },
+            'modes': {}
+        }
+        if 'client' in modes:
+            print("🧪 Test client")
+            results['modes']['client'] = run_client(app, tokens, bodies, counter, args.requests)
+        if 'http' in modes:
+            server = None
+            if args.server_url:
+                base_url, http_counter = args.server_url, None
+            else:
+                server, base_url = serve(app)
+                http_counter = counter
+            print(f"🌐 HTTP load against {base_url}")
+            results['modes']['http'] = run_http(base_url, tokens, bodies, http_counter, args.processes, args.seconds)
+            if server:
+                server.shutdown()
+        with app.app_context():
+            from models import db
+            db.engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help='10k, 100k, 1m or a row count per table')
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file, seeded on each run)')
+    parser.add_argument('--modes', default='client,http', help='comma-separated: client, http')
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint in client mode')
+    parser.add_argument('--processes', type=int, default=4, help='load-generator processes in http mode')
+    parser.add_argument('--seconds', type=float, default=10, help='seconds per endpoint in http mode')
+    parser.add_argument('--server-url', help='load an already running server (pass --url for its database)')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='earlier --output file to check for regressions')
+    args = parser.parse_args()
+
+    results = main(args)
+    if args.compare:
+        regressions = compare(results, args.compare)
+        results['regressions'] = regressions
+        for line in regressions:
+            print(f"⚠️  Regression: {line}")
+        if not regressions:
+            print("✅ No regressions against the baseline")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
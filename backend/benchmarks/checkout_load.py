@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Checkout throughput / tail latency against the local Stripe stub
+
+Starts benchmarks/stripe_stub.py in-process, points stripe_api at it, and
+drives POST /api/checkout/create from concurrent client threads.
+
+Usage (from backend/):
+  python benchmarks/checkout_load.py [--concurrency 16] [--seconds 10]
+      [--latency-ms 150] [--error-rate 0.0] [--output checkout.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+import stripe_stub  # noqa: E402
+from common import percentile  # noqa: E402
+
+
+def main(args):
+    server, base_url = stripe_stub.start(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 3,
+                                         error_rate=args.error_rate)
+    # stripe_api reads these at import time
+    os.environ['STRIPE_API_BASE'] = base_url
+    os.environ.setdefault('STRIPE_SECRET_KEY', 'sk_test_stub')
+    for name in ('PRICE_ONE_TIME', 'PRICE_STARTER', 'PRICE_GROWTH'):
+        os.environ.setdefault(name, f'price_stub_{name.lower()}')
+
+    from app import create_app
+    from auth import generate_token
+    from bootstrap import bootstrap
+    from models import User
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': args.url or f'sqlite:///{os.path.join(tmp, "checkout.db")}'})
+        bootstrap(app)
+        with app.app_context():
+            admin = User.query.filter_by(role='admin').first()
+            token = generate_token(admin.id, admin.email, admin.role)
+
+        latencies, statuses, lock = [], {}, threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+
+        def worker():
+            client = app.test_client()
+            headers = {'Authorization': f'Bearer {token}'}
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = client.post('/api/checkout/create', headers=headers, json={'plan': 'starter'})
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with app.app_context():
+            from models import db
+            db.engine.dispose()
+    server.shutdown()
+
+    return {
+        'concurrency': args.concurrency,
+        'stub_latency_ms': args.latency_ms,
+        'requests': len(latencies),
+        'rps': round(len(latencies) / args.seconds, 1),
+        'p50_ms': round(percentile(latencies, 50, default=0), 2),
+        'p95_ms': round(percentile(latencies, 95, default=0), 2),
+        'p99_ms': round(percentile(latencies, 99, default=0), 2),
+        'statuses': statuses
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='database URL (default: temporary SQLite file)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--latency-ms', type=float, default=150.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = main(args)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
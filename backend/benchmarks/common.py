@@ -0,0 +1,16 @@
+"""Helpers shared by the benchmark scripts"""
+
+import os
+
+from cryptography.fernet import Fernet
+
+# One throwaway key for the run, inherited by every server and worker process it starts
+os.environ.setdefault('ENCRYPTION_KEY', Fernet.generate_key().decode())
+
+
+def percentile(values, pct, default=None):
+    """Nearest-rank percentile of values; default when there are none"""
+    if not values:
+        return default
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
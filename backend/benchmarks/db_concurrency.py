@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Database concurrency benchmark for the engine profiles in db_config.py
+
+Runs reader threads (GET /api/accounts) and writer threads
+(PATCH /api/admin/accounts/<id>) against the Flask app in parallel, once with
+SQLAlchemy's default engine settings and once with the tuned profile, and
+reports read/write throughput and latency for each.
+
+Usage (from backend/):
+  python benchmarks/db_concurrency.py                       # temporary SQLite files
+  python benchmarks/db_concurrency.py --url postgresql://... # existing Postgres database
+  options: --readers 8 --writers 2 --seconds 10 --output db_concurrency.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import percentile  # noqa: E402
+from app import create_app  # noqa: E402
+from auth import generate_token  # noqa: E402
+from bootstrap import bootstrap  # noqa: E402
+from models import db, User, Order, Account  # noqa: E402
+
+
+def seed(app, accounts=200):
+    bootstrap(app)
+    with app.app_context():
+        user = User.query.filter_by(email='bench@warmup.ai').first()
+        if not user:
+            user = User(email='bench@warmup.ai', role='client', password_hash='!')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Order(user_id=user.id, plan='starter', amount=29900, status='paid'))
+            db.session.add_all([
+                Account(user_id=user.id, username=f'bench_{i}', niche='fitness', status='warming')
+                for i in range(accounts)
+            ])
+            db.session.commit()
+        admin = User.query.filter_by(role='admin').first()
+        account_ids = [row.id for row in db.session.query(Account.id).filter_by(user_id=user.id)]
+        return (generate_token(user.id, user.email, user.role),
+                generate_token(admin.id, admin.email, admin.role),
+                account_ids)
+
+
+def worker(app, kind, token, account_ids, deadline, results):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies, errors, i = [], 0, 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if kind == 'read':
+            response = client.get('/api/accounts', headers=headers)
+        else:
+            account_id = account_ids[i % len(account_ids)]
+            response = client.patch(f'/api/admin/accounts/{account_id}', headers=headers,
+                                    json={'progress_percentage': i % 100})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            errors += 1
+        i += 1
+    results[kind].append((latencies, errors))
+
+
+def run_profile(url, profile, readers, writers, seconds):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'DB_ENGINE_PROFILE': profile})
+    client_token, admin_token, account_ids = seed(app)
+
+    results = {'read': [], 'write': []}
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=worker, args=(app, 'read', client_token, account_ids, deadline, results))
+               for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=(app, 'write', admin_token, account_ids, deadline, results))
+                for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with app.app_context():
+        db.engine.dispose()
+
+    report = {}
+    for kind, samples in results.items():
+        latencies = [ms for lat, _ in samples for ms in lat]
+        report[kind] = {
+            'requests': len(latencies),
+            'errors': sum(err for _, err in samples),
+            'rps': round(len(latencies) / seconds, 1),
+            'p50_ms': round(percentile(latencies, 50) or 0, 2),
+            'p95_ms': round(percentile(latencies, 95) or 0, 2),
+            'p99_ms': round(percentile(latencies, 99) or 0, 2)
+        }
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='database URL (default: a fresh temporary SQLite file per profile)')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ('default', 'tuned'):
+            url = args.url or f'sqlite:///{os.path.join(tmp, profile + ".db")}'
+            results[profile] = run_profile(url, profile, args.readers, args.writers, args.seconds)
+            print(f"{profile:>8}: {json.dumps(results[profile])}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Polling benchmark for the client read endpoints
+
+A dashboard polls /api/accounts, /api/orders, /api/auth/me and
+/api/accounts/<id>/progress while nothing changes. Each endpoint is hit
+--requests times as a plain GET (full payload every time) and again as a
+conditional GET carrying the ETag from the first response (304 until the
+user's data changes), reporting throughput and latency for both.
+
+Usage (from backend/):
+  python benchmarks/polling.py [--accounts 500] [--requests 2000] [--url postgresql://...] [--output polling.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import percentile  # noqa: E402
+from app import create_app  # noqa: E402
+from auth import generate_token  # noqa: E402
+from bootstrap import bootstrap  # noqa: E402
+from models import db, User, Order, Account  # noqa: E402
+
+
+def seed(app, accounts):
+    bootstrap(app)
+    with app.app_context():
+        user = User(email=f'poll_{time.time_ns()}@warmup.ai', role='client', password_hash='!')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Order(user_id=user.id, plan='starter', amount=29900, status='paid') for _ in range(5)])
+        db.session.add_all([
+            Account(user_id=user.id, username=f'poll_{i}', niche='fitness', status='warming')
+            for i in range(accounts)
+        ])
+        db.session.commit()
+        account_id = db.session.query(Account.id).filter_by(user_id=user.id).first().id
+        return generate_token(user.id, user.email, user.role), account_id
+
+
+def poll(client, path, headers, requests):
+    latencies, statuses = [], {}
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    total = sum(latencies) / 1000
+    return {
+        'statuses': statuses,
+        'rps': round(len(latencies) / total, 1),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3)
+    }
+
+
+def run(url, accounts, requests):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    token, account_id = seed(app, accounts)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    results = {}
+    for path in ('/api/accounts', '/api/orders', '/api/auth/me', f'/api/accounts/{account_id}/progress'):
+        etag = client.get(path, headers=headers).headers.get('ETag')
+        results[path] = {
+            'full': poll(client, path, headers, requests),
+            'conditional': poll(client, path, dict(headers, **{'If-None-Match': etag}), requests)
+        }
+        speedup = results[path]['conditional']['rps'] / results[path]['full']['rps']
+        print(f"{path:>32}: {results[path]['full']['rps']:>8} rps full, "
+              f"{results[path]['conditional']['rps']:>8} rps conditional ({speedup:.1f}x)")
+    with app.app_context():
+        db.engine.dispose()
+    return {'accounts': accounts, 'requests': requests, 'endpoints': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file)')
+    parser.add_argument('--accounts', type=int, default=500, help='accounts owned by the polling user')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per endpoint and mode')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(args.url or f'sqlite:///{os.path.join(tmp, "polling.db")}', args.accounts, args.requests)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Scheduler benchmark: schedule, pause/resume and drain N warming accounts
+
+Pure in-memory (no database). Schedules --accounts accounts with staggered
+start times, pauses and resumes a fraction of them, then advances simulated
+time through the whole warmup and pops every due session.
+
+Usage (from backend/):
+  python benchmarks/scheduler_bench.py [--accounts 100000] [--pause-fraction 0.1] [--output scheduler.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import WARMUP_DAYS  # noqa: E402
+from scheduler import WarmupScheduler, DAY_SECONDS, to_timestamp  # noqa: E402
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(accounts, pause_fraction, step_seconds):
+    rng = random.Random(42)
+    base = datetime(2025, 1, 1)
+    now = to_timestamp(base)
+    starts = {i: base + timedelta(seconds=rng.uniform(0, DAY_SECONDS)) for i in range(1, accounts + 1)}
+    scheduler = WarmupScheduler()
+
+    tracemalloc.start()
+    _, schedule_time = timed(lambda: [scheduler.schedule(i, starts[i], now) for i in starts])
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    paused = rng.sample(sorted(starts), int(accounts * pause_fraction))
+    _, pause_time = timed(lambda: [scheduler.pause(i) for i in paused])
+    _, resume_time = timed(lambda: [scheduler.resume(i, starts[i], now) for i in paused])
+
+    popped = 0
+    end = now + (WARMUP_DAYS + 1) * DAY_SECONDS
+    drain_start = time.perf_counter()
+    clock = now
+    while clock <= end:
+        popped += len(scheduler.pop_due(clock))
+        clock += step_seconds
+    drain_time = time.perf_counter() - drain_start
+
+    def per_op_us(seconds, ops):
+        return round(seconds / ops * 1e6, 3) if ops else None
+
+    return {
+        'accounts': accounts,
+        'sessions_popped': popped,
+        'schedule_us_per_account': per_op_us(schedule_time, accounts),
+        'pause_us_per_account': per_op_us(pause_time, len(paused)),
+        'resume_us_per_account': per_op_us(resume_time, len(paused)),
+        'pop_us_per_session': per_op_us(drain_time, popped),
+        'drain_seconds': round(drain_time, 3),
+        'schedule_peak_mb': round(peak_bytes / 1024 / 1024, 1)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=100000)
+    parser.add_argument('--pause-fraction', type=float, default=0.1)
+    parser.add_argument('--step-seconds', type=float, default=60, help='simulated seconds per scheduler tick')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = run(args.accounts, args.pause_fraction, args.step_seconds)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Seed a database with N users, N orders and N accounts for benchmarking
+
+Rows go in with chunked multi-row Core INSERTs (one transaction per chunk),
+so 1M rows per table take minutes rather than hours. Every seeded user shares
+one bcrypt hash of SEED_PASSWORD, computed once. Seeding is idempotent: a
+database that already holds the requested scale is left alone.
+
+Usage (from backend/):
+  python benchmarks/seed.py --scale 100k [--url postgresql://...]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select, func  # noqa: E402
+
+import common  # noqa: E402,F401  (a throwaway ENCRYPTION_KEY unless one is set)
+from app import create_app  # noqa: E402
+from bootstrap import bootstrap  # noqa: E402
+from hashing import hash_password  # noqa: E402
+from models import db, User, Order, Account, ACCOUNT_STATUSES  # noqa: E402
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+SEED_EMAIL = 'seed-{}@bench.warmup.ai'
+SEED_PASSWORD = 'bench-password'
+CHUNK_SIZE = 5000
+PLANS = (('one_time', 7500), ('starter', 29900), ('growth', 49900))
+NICHES = ('fitness', 'food', 'travel', 'fashion', 'tech')
+
+
+def parse_scale(value):
+    value = value.lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+def seeded_users():
+    return db.session.execute(
+        select(func.count(User.id)).where(User.email.like(SEED_EMAIL.format('%')))
+    ).scalar()
+
+
+def _insert_chunks(table, count, make_row, label):
+    start = time.perf_counter()
+    for offset in range(0, count, CHUNK_SIZE):
+        db.session.execute(insert(table), [make_row(i) for i in range(offset, min(offset + CHUNK_SIZE, count))])
+        db.session.commit()
+    elapsed = time.perf_counter() - start
+    print(f"  {label}: {count} rows in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s)")
+
+
+def seed(app, n):
+    """Bootstrap the schema and seed n users/orders/accounts; returns the first seeded user id"""
+    bootstrap(app)
+    with app.app_context():
+        existing = seeded_users()
+        if existing and existing != n:
+            raise SystemExit(f"❌ Database already holds {existing} seeded users; use a fresh database for scale {n}")
+        if not existing:
+            print(f"🌱 Seeding {n} users, orders and accounts")
+            password_hash = hash_password(SEED_PASSWORD)
+            base_time = datetime.utcnow() - timedelta(days=30)
+            _insert_chunks(User.__table__, n, lambda i: {
+                'email': SEED_EMAIL.format(i), 'password_hash': password_hash, 'role': 'client',
+                'created_at': base_time + timedelta(seconds=i), 'data_version': 0
+            }, 'users')
+
+        first_user = db.session.execute(
+            select(func.min(User.id)).where(User.email.like(SEED_EMAIL.format('%')))
+        ).scalar()
+
+        if not existing:
+            _insert_chunks(Order.__table__, n, lambda i: {
+                'user_id': first_user + i, 'plan': PLANS[i % 3][0], 'amount': PLANS[i % 3][1],
+                'status': 'paid' if i % 4 else 'pending', 'stripe_session_id': f'cs_seed_{i}',
+                'created_at': base_time + timedelta(seconds=i)
+            }, 'orders')
+            _insert_chunks(Account.__table__, n, lambda i: {
+                'user_id': first_user + i, 'order_id': None, 'username': f'seed_{i}',
+                'niche': NICHES[i % len(NICHES)], 'status': ACCOUNT_STATUSES[i % len(ACCOUNT_STATUSES)],
+                'current_day': i % 6, 'progress_percentage': (i * 7) % 101, 'reels_viewed': i % 500,
+                'accounts_followed': i % 90, 'comments_left': i % 40,
+                'created_at': base_time + timedelta(seconds=i), 'status_changed_at': base_time
+            }, 'accounts')
+        return first_user
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help='10k, 100k, 1m or a row count')
+    parser.add_argument('--url', help='database URL (default: DATABASE_URL)')
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.url} if args.url else None)
+    seed(app, parse_scale(args.scale))
+    print("✅ Seed complete")
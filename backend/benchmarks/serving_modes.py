@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Concurrent checkout throughput per gunicorn worker class
+
+For each mode in --modes (sync, gthread, gevent) this starts gunicorn with
+gunicorn.conf.py against a fresh database and the local Stripe stub
+(benchmarks/stripe_stub.py, in a separate process), then holds
+--concurrency keep-alive clients on POST /api/checkout/create for --seconds.
+Modes whose packages aren't installed are skipped.
+
+Usage (from backend/):
+  python benchmarks/serving_modes.py [--modes sync,gthread,gevent] [--workers 2]
+      [--concurrency 64] [--seconds 10] [--latency-ms 150] [--url postgresql://...] [--output serving.json]
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from common import percentile  # noqa: E402
+
+JWT_SECRET = 'serving-modes-benchmark'
+REQUIRES = {'sync': 'gunicorn', 'gthread': 'gunicorn', 'gevent': 'gevent'}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def drive(port, token, concurrency, seconds):
+    latencies, statuses, lock = [], {}, threading.Lock()
+    body = json.dumps({'plan': 'starter'})
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/api/checkout/create', body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                status = 'error'
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 50, default=0), 2),
+        'p95_ms': round(percentile(latencies, 95, default=0), 2),
+        'p99_ms': round(percentile(latencies, 99, default=0), 2),
+        'statuses': {str(code): count for code, count in statuses.items()}
+    }
+
+
+def run_mode(mode, args, stub_url, tmp):
+    url = args.url or f"sqlite:///{os.path.join(tmp, f'{mode}.db')}"
+    port = free_port()
+    env = dict(os.environ,
+               DATABASE_URL=url,
+               JWT_SECRET=JWT_SECRET,
+               STRIPE_API_BASE=stub_url,
+               STRIPE_SECRET_KEY='sk_test_stub',
+               PRICE_ONE_TIME='price_stub_one_time',
+               PRICE_STARTER='price_stub_starter',
+               PRICE_GROWTH='price_stub_growth',
+               FRONTEND_URL='http://localhost',
+               GUNICORN_WORKER_CLASS=mode,
+               WEB_CONCURRENCY=str(args.workers),
+               PORT=str(port),
+               LOG_LEVEL='WARNING',
+               GUNICORN_LOG_LEVEL='warning',
+               BCRYPT_ROUNDS='4')
+    subprocess.run([sys.executable, 'bootstrap.py'], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(port):
+            raise SystemExit(f"❌ gunicorn ({mode}) did not start")
+        from auth import generate_token
+        token = generate_token(1, 'admin@warmup.ai', 'admin')  # the bootstrap admin
+        drive(port, token, min(args.concurrency, 8), 1)  # warm up connections and pools
+        return drive(port, token, args.concurrency, args.seconds)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(args):
+    os.environ['JWT_SECRET'] = JWT_SECRET  # auth reads it at import; must match the servers
+    stub_port = free_port()
+    stub = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'stripe_stub.py'),
+                             '--port', str(stub_port), '--latency-ms', str(args.latency_ms),
+                             '--jitter-ms', str(args.latency_ms / 3)], stdout=subprocess.DEVNULL)
+    results = {'workers': args.workers, 'concurrency': args.concurrency,
+               'stub_latency_ms': args.latency_ms, 'modes': {}}
+    tmp = tempfile.mkdtemp()
+    try:
+        for mode in args.modes.split(','):
+            if importlib.util.find_spec(REQUIRES[mode]) is None:
+                print(f"⚠️  Skipping {mode}: {REQUIRES[mode]} is not installed")
+                continue
+            results['modes'][mode] = run_mode(mode, args, f'http://127.0.0.1:{stub_port}', tmp)
+            print(f"{mode:>8}: {json.dumps(results['modes'][mode])}")
+    finally:
+        stub.terminate()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes per mode')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--latency-ms', type=float, default=150.0, help='Stripe stub response time')
+    parser.add_argument('--url', help='database URL (default: a fresh SQLite file per mode)')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = main(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
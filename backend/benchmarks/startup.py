@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Worker startup benchmark
+
+Starts a fresh interpreter N times (like a gunicorn worker boot) and measures
+how long `import app` takes and how long until the first request is served.
+
+Usage (from backend/):
+  python benchmarks/startup.py [--runs 20] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+response = client.get('/api/health')
+assert response.status_code == 200, response.status_code
+t2 = time.perf_counter()
+print(json.dumps({'import_ms': (t1 - t0) * 1000, 'first_request_ms': (t2 - t0) * 1000}))
+'''
+
+
+def summarize(values):
+    return {
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2),
+        'max': round(max(values), 2),
+        'mean': round(statistics.mean(values), 2)
+    }
+
+
+def run(runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', PROBE],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        'runs': runs,
+        'import_ms': summarize([s['import_ms'] for s in samples]),
+        'time_to_first_request_ms': summarize([s['first_request_ms'] for s in samples])
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Stripe API, for offline load tests
+
+Answers the checkout endpoints the backend uses with canned objects after a
+configurable delay, and can inject 5xx errors to exercise retries and the
+circuit breaker. Point the backend at it with STRIPE_API_BASE.
+
+Usage:
+  python benchmarks/stripe_stub.py [--port 12111] [--latency-ms 150] [--jitter-ms 50] [--error-rate 0.0]
+  STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_stub gunicorn app:app
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    latency_ms = 150.0
+    jitter_ms = 50.0
+    error_rate = 0.0
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like api.stripe.com
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Request-Id', f'req_{uuid.uuid4().hex[:14]}')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self):
+        delay = StubConfig.latency_ms + random.uniform(-StubConfig.jitter_ms, StubConfig.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+    def _fail(self):
+        if random.random() < StubConfig.error_rate:
+            self._reply(500, {'error': {'type': 'api_error', 'message': 'Stub injected failure'}})
+            return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self._delay()
+        if self._fail():
+            return
+        if self.path.startswith('/v1/checkout/sessions'):
+            session_id = f'cs_test_{uuid.uuid4().hex}'
+            self._reply(200, {'id': session_id, 'object': 'checkout.session',
+                              'url': f'https://checkout.stripe.test/pay/{session_id}'})
+        elif self.path.startswith('/v1/billing_portal/sessions'):
+            self._reply(200, {'id': f'bps_{uuid.uuid4().hex}', 'object': 'billing_portal.session',
+                              'url': 'https://billing.stripe.test/session'})
+        else:
+            self._reply(404, {'error': {'type': 'invalid_request_error', 'message': f'Unknown path {self.path}'}})
+
+    def do_GET(self):
+        self._delay()
+        if self._fail():
+            return
+        if self.path.startswith('/v1/checkout/sessions/'):
+            session_id = self.path.rsplit('/', 1)[-1].split('?')[0]
+            self._reply(200, {'id': session_id, 'object': 'checkout.session', 'status': 'open'})
+        else:
+            self._reply(404, {'error': {'type': 'invalid_request_error', 'message': f'Unknown path {self.path}'}})
+
+
+def start(port=0, latency_ms=150.0, jitter_ms=50.0, error_rate=0.0):
+    """Run the stub on a daemon thread; returns (server, base_url)"""
+    StubConfig.latency_ms = latency_ms
+    StubConfig.jitter_ms = jitter_ms
+    StubConfig.error_rate = error_rate
+    server = ThreadingHTTPServer(('127.0.0.1', port), StripeStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--latency-ms', type=float, default=150.0)
+    parser.add_argument('--jitter-ms', type=float, default=50.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start(args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Stripe stub listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+One-off bootstrap for the Warmup.ai backend
+
+Creates tables, applies pending migrations and makes sure the default admin
+user exists. Run it once per deploy, before starting gunicorn, instead of in
+every worker at import time:
+
+  python bootstrap.py && gunicorn app:app
+"""
+
+import logging
+
+from models import db, User
+import migrations
+import stripe_api
+
+logger = logging.getLogger(__name__)
+
+
+def bootstrap(app):
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine)
+
+        # Create admin user if not exists
+        admin = User.query.filter_by(email='admin@warmup.ai').first()
+        if not admin:
+            admin = User(email='admin@warmup.ai', role='admin')
+            admin.set_password('admin123')
+            db.session.add(admin)
+            db.session.commit()
+            logger.warning('Created default admin user admin@warmup.ai; change its password')
+
+    stripe_api.print_diagnostics()
+
+
+if __name__ == '__main__':
+    from app import app
+    bootstrap(app)
+    print("✅ Bootstrap complete")
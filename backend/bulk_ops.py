@@ -0,0 +1,200 @@
+import os
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select, update, delete, func
+
+from models import (db, Order, Account, ACCOUNT_STATUSES, ORDER_STATUSES, WARMUP_DAYS,
+                    can_transition, owner_has_plan, pause_change_columns)
+from notifier import publish_account_change, PROGRESS_FIELDS
+import job_queue
+import proxy_pool
+from stats import invalidate_stats
+from versioning import bump_data_version
+
+# Admin bulk operations behind POST /api/admin/bulk. A request picks rows by
+# an id list, a filter, or both (intersected) and applies one action to all
+# of them in a single transaction:
+#   set_status    accounts or orders; accounts only move along STATUS_TRANSITIONS
+#   assign_proxy  accounts; onto one proxy (which must have room) or off proxies (null)
+#   delete        accounts, with their warmup jobs
+#   mark_paid     orders
+#
+# The matching rows are read and locked with one SELECT ... FOR UPDATE, then
+# changed with one set-based UPDATE/DELETE guarded on the state we read.
+# The side effects a row-by-row admin edit would trigger happen once for the
+# batch: proxy counters move with one statement each way, users' data_version
+# is bumped, account changes are published to the SSE feed after commit and
+# the stats snapshot is invalidated. At most BULK_MAX_ROWS rows per request.
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', '10000'))
+
+TARGETS = {'accounts': Account, 'orders': Order}
+ACTIONS = {
+    'set_status': ('accounts', 'orders'),
+    'assign_proxy': ('accounts',),
+    'delete': ('accounts',),
+    'mark_paid': ('orders',),
+}
+FILTERS = {
+    'accounts': {
+        'status': lambda value: Account.status == value,
+        'niche': lambda value: Account.niche == value,
+        'user_id': lambda value: Account.user_id == value,
+        'order_id': lambda value: Account.order_id == value,
+        'proxy_id': lambda value: Account.proxy_id.is_(None) if value is None else Account.proxy_id == value,
+        'plan': owner_has_plan,
+    },
+    'orders': {
+        'status': lambda value: Order.status == value,
+        'plan': lambda value: Order.plan == value,
+        'user_id': lambda value: Order.user_id == value,
+    },
+}
+
+
+class InvalidBulkRequest(ValueError):
+    """The request can't be applied; nothing was changed"""
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def conditions(target, ids=None, filters=None):
+    """WHERE clauses selecting the rows; refuses an empty selection rather than touching the whole table"""
+    model = TARGETS[target]
+    clauses = []
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(_is_id(i) for i in ids):
+            raise InvalidBulkRequest('ids must be a non-empty list of integers')
+        if len(ids) > BULK_MAX_ROWS:
+            raise InvalidBulkRequest(f'At most {BULK_MAX_ROWS} ids per request')
+        clauses.append(model.id.in_(set(ids)))
+    if filters is not None:
+        if not isinstance(filters, dict):
+            raise InvalidBulkRequest('filter must be an object')
+        unknown = sorted(set(filters) - set(FILTERS[target]))
+        if unknown:
+            raise InvalidBulkRequest(f"Unknown {target} filter(s): {', '.join(unknown)}")
+        clauses.extend(FILTERS[target][field](value) for field, value in filters.items())
+    if not clauses:
+        raise InvalidBulkRequest('Select rows with ids or a non-empty filter')
+    return clauses
+
+
+def _lock_rows(target, clauses):
+    model = TARGETS[target]
+    columns = [model.id, model.user_id, model.status]
+    if target == 'accounts':
+        columns.append(Account.proxy_id)
+    rows = db.session.execute(
+        select(*columns).where(*clauses).order_by(model.id).limit(BULK_MAX_ROWS + 1).with_for_update()
+    ).all()
+    if len(rows) > BULK_MAX_ROWS:
+        raise InvalidBulkRequest(f'More than {BULK_MAX_ROWS} rows match; narrow the selection')
+    return rows
+
+
+def _account_status_values(status, now):
+    values = {'status': status, 'status_changed_at': now, **pause_change_columns(status, now)}
+    if status == 'warming':
+        values['started_at'] = func.coalesce(Account.started_at, now)
+    if status == 'completed':
+        values.update(completed_at=now, current_day=WARMUP_DAYS, progress_percentage=100)
+    return values
+
+
+def run(action, target, ids=None, filters=None, status=None, proxy_id=None, dry_run=False):
+    """Apply one action to every selected row in one transaction; returns the counts.
+
+    matched: rows selected; changed: rows written; unchanged: already in the
+    requested state; skipped: not allowed (account status transitions) or
+    changed by someone else between our read and write.
+    """
+    if target not in TARGETS:
+        raise InvalidBulkRequest('target must be accounts or orders')
+    if action not in ACTIONS:
+        raise InvalidBulkRequest(f"action must be one of: {', '.join(ACTIONS)}")
+    if target not in ACTIONS[action]:
+        raise InvalidBulkRequest(f'{action} does not apply to {target}')
+    if action == 'mark_paid':
+        status = 'paid'
+    if action in ('set_status', 'mark_paid'):
+        allowed = ACCOUNT_STATUSES if target == 'accounts' else ORDER_STATUSES
+        if status not in allowed:
+            raise InvalidBulkRequest(f"status must be one of: {', '.join(allowed)}")
+    if action == 'assign_proxy' and proxy_id is not None and not isinstance(proxy_id, str):
+        raise InvalidBulkRequest('proxy_id must be a proxy key or null')
+
+    rows = _lock_rows(target, conditions(target, ids, filters))
+    if action == 'delete':
+        pending, unchanged, skipped = rows, [], []
+    elif action == 'assign_proxy':
+        pending = [row for row in rows if row.proxy_id != proxy_id]
+        unchanged, skipped = [row for row in rows if row.proxy_id == proxy_id], []
+    else:
+        unchanged = [row for row in rows if row.status == status]
+        pending = [row for row in rows if row.status != status]
+        if target == 'accounts':
+            skipped = [row for row in pending if not can_transition(row.status, status)]
+            pending = [row for row in pending if can_transition(row.status, status)]
+        else:
+            skipped = []
+
+    result = {'action': action, 'target': target, 'matched': len(rows), 'changed': len(pending),
+              'unchanged': len(unchanged), 'skipped': len(skipped), 'dry_run': dry_run}
+    if dry_run or not pending:
+        db.session.rollback()
+        return result
+
+    ids = [row.id for row in pending]
+    changes = []  # (user_id, account_id, fields) to publish after commit
+    if target == 'orders':
+        written = db.session.execute(
+            update(Order).where(Order.id.in_(ids), Order.status != status)
+            .values(status=status)
+            .returning(Order.id, Order.user_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+    elif action == 'set_status':
+        columns = [getattr(Account, field) for field in PROGRESS_FIELDS]
+        written = db.session.execute(
+            update(Account)
+            .where(Account.id.in_(ids), Account.status.in_({row.status for row in pending}))
+            .values(**_account_status_values(status, datetime.utcnow()))
+            .returning(Account.id, Account.user_id, *columns)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for row in written:
+            fields = row._asdict()
+            changes.append((fields.pop('user_id'), fields.pop('id'), fields))
+    elif action == 'assign_proxy':
+        if proxy_id is not None:
+            proxy_pool.claim_many(proxy_id, len(pending))
+        proxy_pool.release_many(Counter(row.proxy_id for row in pending))
+        written = db.session.execute(
+            update(Account).where(Account.id.in_(ids))
+            .values(proxy_id=proxy_id)
+            .returning(Account.id, Account.user_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+    else:
+        job_queue.delete_account_jobs(ids)
+        written = db.session.execute(
+            delete(Account).where(Account.id.in_(ids))
+            .returning(Account.id, Account.user_id, Account.proxy_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        proxy_pool.release_many(Counter(row.proxy_id for row in written))
+        changes = [(row.user_id, row.id, {'deleted': True}) for row in written]
+
+    bump_data_version(row.user_id for row in written)
+    db.session.commit()
+
+    for user_id, account_id, fields in changes:
+        publish_account_change(user_id, account_id, **fields)
+    if action != 'assign_proxy':
+        invalidate_stats()
+    result['skipped'] += len(pending) - len(written)
+    result['changed'] = len(written)
+    return result
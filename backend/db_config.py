@@ -0,0 +1,78 @@
+import os
+
+from sqlalchemy import event
+
+from models import db
+
+# Engine profiles, picked by DATABASE_URL scheme. Set DB_ENGINE_PROFILE=default
+# to fall back to SQLAlchemy's stock settings (used by the concurrency benchmark).
+#
+# Postgres: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT,
+#           DB_STATEMENT_TIMEOUT_MS, DB_CONNECT_TIMEOUT
+# SQLite:   SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE
+
+
+def database_url():
+    url = os.getenv('DATABASE_URL', 'sqlite:///warmup.db')
+    # Railway/Heroku hand out postgres://, which SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def postgres_options():
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True,
+        'connect_args': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+            'options': f'-c statement_timeout={statement_timeout} '
+                       f'-c idle_in_transaction_session_timeout={statement_timeout * 4}'
+        }
+    }
+
+
+def sqlite_options():
+    busy_timeout_ms = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    return {
+        'connect_args': {
+            'timeout': busy_timeout_ms / 1000,
+            'check_same_thread': False
+        }
+    }
+
+
+def engine_options(url, profile=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URL"""
+    profile = profile or os.getenv('DB_ENGINE_PROFILE', 'tuned')
+    if profile == 'default':
+        return {}
+    if url.startswith('postgresql'):
+        return postgres_options()
+    if url.startswith('sqlite'):
+        return sqlite_options()
+    return {}
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.execute(f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))}")
+    cursor.close()
+
+
+def configure_engines(app):
+    """Attach per-connection setup to the app's engines (call after db.init_app)"""
+    if app.config.get('DB_ENGINE_PROFILE', os.getenv('DB_ENGINE_PROFILE', 'tuned')) == 'default':
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+                event.listen(engine, 'connect', set_sqlite_pragmas)
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from models import db, User, Order, Account, owner_has_plan
+
+# Streaming admin exports. Rows are read as plain column tuples through a
+# server-side cursor (yield_per) and written out in ~64 KB chunks, so memory
+# stays flat however large the table is. The owner's email comes from a join
+# rather than a lazy load per row. Passwords are never exported. CSV text
+# cells that a spreadsheet would run as a formula are prefixed with a quote.
+YIELD_PER = 1000
+CHUNK_BYTES = 64 * 1024
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORTS = {
+    'users': {
+        'columns': [User.id, User.email, User.role, User.created_at],
+        'filters': {'role': User.role},
+    },
+    'orders': {
+        'columns': [Order.id, Order.user_id, User.email.label('user_email'), Order.plan,
+                    (Order.amount / 100.0).label('amount'), Order.status, Order.stripe_session_id,
+                    Order.stripe_payment_id, Order.stripe_customer_id, Order.stripe_subscription_id,
+                    Order.created_at],
+        'join': (User, Order.user_id == User.id),
+        'filters': {'status': Order.status, 'plan': Order.plan},
+    },
+    'accounts': {
+        'columns': [Account.id, Account.user_id, User.email.label('user_email'), Account.order_id,
+                    Account.username, Account.email, Account.niche, Account.status, Account.current_day,
+                    Account.progress_percentage, Account.reels_viewed, Account.accounts_followed,
+                    Account.comments_left, Account.proxy_id, Account.created_at, Account.started_at,
+                    Account.completed_at],
+        'join': (User, Account.user_id == User.id),
+        'filters': {'status': Account.status, 'niche': Account.niche},
+        'conditions': {'plan': owner_has_plan},
+    },
+}
+
+
+def build_query(kind, args):
+    """SELECT for an export, filtered by any of its filters or conditions present in args"""
+    spec = EXPORTS[kind]
+    query = select(*spec['columns'])
+    if 'join' in spec:
+        query = query.join(*spec['join'])
+    for field, column in spec['filters'].items():
+        if args.get(field):
+            query = query.where(column == args[field])
+    for field, condition in spec.get('conditions', {}).items():
+        if args.get(field):
+            query = query.where(condition(args[field]))
+    return query.order_by(spec['columns'][0])
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _csv_value(value):
+    value = _value(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _chunked(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_rows(query, fmt):
+    """Yield the export as text chunks in the given format"""
+    result = db.session.execute(query.execution_options(yield_per=YIELD_PER))
+    keys = list(result.keys())
+
+    if fmt == 'csv':
+        out = io.StringIO()
+        writer = csv.writer(out)
+
+        def lines():
+            writer.writerow(keys)
+            for row in result:
+                writer.writerow([_csv_value(value) for value in row])
+                line = out.getvalue()
+                out.seek(0)
+                out.truncate()
+                yield line
+    else:
+        def lines():
+            for row in result:
+                yield json.dumps(dict(zip(keys, map(_value, row))), separators=(',', ':')) + '\n'
+
+    try:
+        yield from _chunked(lines())
+    finally:
+        result.close()
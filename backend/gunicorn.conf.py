@@ -0,0 +1,64 @@
+# Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+#
+# Most of our request time is spent waiting on Stripe, Postgres or an open
+# SSE stream, so we don't use the sync worker (where each of those holds a
+# whole process). GUNICORN_WORKER_CLASS picks:
+#   gevent   WEB_CONCURRENCY processes x GUNICORN_WORKER_CONNECTIONS greenlets
+#            (default when gevent is installed; see requirements.txt)
+#   gthread  WEB_CONCURRENCY processes x GUNICORN_THREADS threads (default otherwise)
+#   sync     one request per process, as before
+#
+# Open progress streams (GET /api/accounts/stream) hold a thread or greenlet
+# each, so SSE_MAX_STREAMS is sized to the worker class: half the greenlets
+# under gevent, a quarter of the threads under gthread, none under sync.
+#
+# Database connections stay bounded either way: each process keeps at most
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections (see db_config.py) and requests
+# beyond that wait up to DB_POOL_TIMEOUT for one, instead of every thread or
+# greenlet opening its own. Flask-SQLAlchemy scopes sessions to the app
+# context, which is a contextvar, so each greenlet gets its own session.
+import importlib.util
+import logging
+import multiprocessing
+import os
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS') or (
+    'gevent' if importlib.util.find_spec('gevent') else 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+# gunicorn quietly turns sync into gthread when threads > 1
+threads = int(os.getenv('GUNICORN_THREADS', '8')) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '200'))
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+# Don't import the app in the master: under gevent the worker must patch
+# the standard library before the app (and psycopg2, requests) are imported
+preload_app = False
+# Logs go to stdout through log_config.py; keep gunicorn's access log off
+accesslog = None
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+if worker_class == 'gevent':
+    # Monkey-patched threads are greenlets, so bcrypt runs on gevent's pool of
+    # real OS threads instead (see hashing.py)
+    os.environ.setdefault('HASH_EXECUTOR', 'gevent')
+    os.environ.setdefault('SSE_MAX_STREAMS', str(worker_connections // 2))
+elif worker_class == 'gthread':
+    # Enough pooled connections for every thread without overflowing
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+    os.environ.setdefault('SSE_MAX_STREAMS', str(max(threads // 4, 1)))
+else:
+    os.environ.setdefault('SSE_MAX_STREAMS', '0')
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent' and os.getenv('DATABASE_URL', '').startswith(('postgres://', 'postgresql')):
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            logging.getLogger('gunicorn.error').warning(
+                'psycogreen/psycopg2 not installed: Postgres queries will block the gevent worker')
+        else:
+            # psycopg2 is a C extension; make its socket waits yield to other greenlets
+            patch_psycopg()
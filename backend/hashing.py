@@ -0,0 +1,90 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import bcrypt
+
+import metrics
+
+# bcrypt is deliberately slow (~250ms at cost 12), so it runs on a bounded
+# executor instead of inline. Configuration:
+#   BCRYPT_ROUNDS      cost factor for new hashes; older hashes are upgraded on login
+#   HASH_EXECUTOR      'thread' (bcrypt releases the GIL), 'process', 'inline' or
+#                      'gevent' (gevent's native thread pool; set by gunicorn.conf.py)
+#   HASH_WORKERS       hashes computed in parallel per gunicorn worker
+#   HASH_MAX_QUEUE     extra hashes allowed to wait; beyond that HashingBusy is raised
+#   HASH_QUEUE_TIMEOUT seconds to wait for a queue slot before giving up
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+HASH_EXECUTOR = os.getenv('HASH_EXECUTOR', 'thread')
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', '2'))
+HASH_MAX_QUEUE = int(os.getenv('HASH_MAX_QUEUE', '8'))
+HASH_QUEUE_TIMEOUT = float(os.getenv('HASH_QUEUE_TIMEOUT', '0.5'))
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_MAX_QUEUE)
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def get_executor():
+    """Create the executor lazily so it is built after gunicorn forks"""
+    global _executor
+    if _executor is None and HASH_EXECUTOR != 'inline':
+        with _executor_lock:
+            if _executor is None:
+                if HASH_EXECUTOR == 'process':
+                    _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+                elif HASH_EXECUTOR == 'gevent':
+                    from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+                    _executor = NativeThreadPoolExecutor(max_workers=HASH_WORKERS)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='bcrypt')
+    return _executor
+
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=HASH_QUEUE_TIMEOUT):
+        raise HashingBusy('Password hashing queue is full')
+    try:
+        with metrics.timer('bcrypt'):
+            executor = get_executor()
+            if executor is None:
+                return fn(*args)
+            return executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password, rounds=None):
+    """Hash a password at BCRYPT_ROUNDS on the hashing executor"""
+    hashed = _run(_hashpw, password.encode('utf-8'), rounds or BCRYPT_ROUNDS)
+    return hashed.decode('utf-8')
+
+
+def check_password(password, password_hash):
+    """Verify a password against a stored bcrypt hash on the hashing executor"""
+    return _run(_checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def hash_rounds(password_hash):
+    """Cost factor of a stored hash ('$2b$12$...' -> 12), or None if unparseable"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made at a different cost than BCRYPT_ROUNDS"""
+    return hash_rounds(password_hash) != BCRYPT_ROUNDS
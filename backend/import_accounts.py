@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Bulk import Instagram accounts from CSV or JSON
+
+Rows need username and user_id (or --user-id for all of them); niche, email,
+password, status and order_id are optional. CSV files use those names as
+their header; JSON files are a list of objects (or {"accounts": [...]}).
+
+The whole batch is validated first, duplicates are found with one query
+against existing (user_id, username) pairs, passwords are encrypted on a
+thread pool and rows are inserted with chunked multi-row INSERTs in a single
+transaction. Every input row gets a result: created, duplicate or invalid.
+The same pipeline backs POST /api/admin/accounts/import.
+
+Usage:
+  python import_accounts.py accounts.csv [--user-id 42] [--dry-run] [--report report.json]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import select, insert
+
+from models import db, User, Order, Account, ACCOUNT_STATUSES, encrypt_many
+from notifier import publish_account_change, PROGRESS_FIELDS
+from stats import invalidate_stats
+from versioning import bump_data_version
+
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '10000'))
+IMPORT_CHUNK_SIZE = 500
+IMPORT_ENCRYPT_WORKERS = int(os.getenv('IMPORT_ENCRYPT_WORKERS', '4'))
+# Text fields are type- and length-checked per row: on Postgres one over-long
+# value would fail the whole multi-row INSERT instead of one row
+TEXT_FIELDS = ('username', 'email', 'password', 'niche', 'status')
+MAX_LENGTHS = {field: getattr(Account, field).type.length for field in ('username', 'email', 'niche')}
+
+
+class InvalidImport(ValueError):
+    """The input as a whole can't be imported"""
+
+
+def parse_rows(text, fmt):
+    """List of row dicts from CSV or JSON text"""
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise InvalidImport(f'Invalid JSON: {e}')
+    if isinstance(data, dict):
+        data = data.get('accounts')
+    if not isinstance(data, list):
+        raise InvalidImport('Expected a list of accounts')
+    return data
+
+
+def _int(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool):
+        raise ValueError
+    return int(value)
+
+
+def validate(rows, default_user_id=None):
+    """(valid rows, report entries for invalid ones); valid rows carry their input index as 'row'"""
+    valid, invalid = [], []
+    for i, raw in enumerate(rows):
+        if not isinstance(raw, dict):
+            invalid.append({'row': i, 'result': 'invalid', 'error': 'Row must be an object'})
+            continue
+        wrong_type = [field for field in TEXT_FIELDS
+                      if raw.get(field) is not None and not isinstance(raw[field], str)]
+        if wrong_type:
+            invalid.append({'row': i, 'result': 'invalid', 'error': f'{wrong_type[0]} must be a string'})
+            continue
+        username = (raw.get('username') or '').replace('@', '').strip()
+        email = (raw.get('email') or '').strip() or None
+        niche = (raw.get('niche') or '').strip() or 'general'
+        entry = {'row': i, 'username': username}
+        try:
+            user_id = _int(raw.get('user_id')) or default_user_id
+            order_id = _int(raw.get('order_id'))
+        except (TypeError, ValueError):
+            invalid.append(dict(entry, result='invalid', error='user_id and order_id must be integers'))
+            continue
+        status = raw.get('status') or 'pending'
+        error = None
+        too_long = [field for field, value in (('username', username), ('email', email), ('niche', niche))
+                    if value and len(value) > MAX_LENGTHS[field]]
+        if not username:
+            error = 'username required'
+        elif too_long:
+            error = f'{too_long[0]} longer than {MAX_LENGTHS[too_long[0]]} characters'
+        elif not user_id:
+            error = 'user_id required'
+        elif status not in ACCOUNT_STATUSES:
+            error = f'Unknown status: {status}'
+        if error:
+            invalid.append(dict(entry, result='invalid', error=error))
+            continue
+        valid.append({
+            'row': i,
+            'user_id': user_id,
+            'order_id': order_id,
+            'username': username,
+            'email': email,
+            'password': raw.get('password') or None,
+            'niche': niche,
+            'status': status
+        })
+    return valid, invalid
+
+
+def _encrypt_parallel(passwords, workers):
+    chunks = [passwords[i:i + IMPORT_CHUNK_SIZE] for i in range(0, len(passwords), IMPORT_CHUNK_SIZE)]
+    if workers <= 1 or len(chunks) <= 1:
+        return [token for chunk in chunks for token in encrypt_many(chunk)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import-encrypt') as pool:
+        return [token for tokens in pool.map(encrypt_many, chunks) for token in tokens]
+
+
+def import_accounts(rows, default_user_id=None, dry_run=False, workers=IMPORT_ENCRYPT_WORKERS):
+    """Validate, dedupe, encrypt and insert rows; commits unless dry_run.
+
+    Returns {'created', 'duplicate', 'invalid', 'rows': [per-row results in input order]}.
+    """
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise InvalidImport(f'At most {IMPORT_MAX_ROWS} accounts per import')
+    valid, report = validate(rows, default_user_id)
+
+    # Unknown users/orders, existing (user_id, username) pairs and repeats within the file
+    user_ids = {row['user_id'] for row in valid}
+    order_ids = {row['order_id'] for row in valid if row['order_id']}
+    known_users = set(db.session.execute(select(User.id).where(User.id.in_(user_ids))).scalars()) if user_ids else set()
+    known_orders = {
+        row.id: row.user_id for row in db.session.execute(
+            select(Order.id, Order.user_id).where(Order.id.in_(order_ids)))
+    } if order_ids else {}
+    existing = {tuple(row) for row in db.session.execute(
+        select(Account.user_id, Account.username)
+        .where(Account.user_id.in_(user_ids), Account.username.in_({row['username'] for row in valid}))
+    )} if valid else set()
+
+    accepted, seen = [], set()
+    for row in valid:
+        entry = {'row': row['row'], 'username': row['username']}
+        key = (row['user_id'], row['username'])
+        if row['user_id'] not in known_users:
+            report.append(dict(entry, result='invalid', error=f"User {row['user_id']} not found"))
+        elif row['order_id'] and known_orders.get(row['order_id']) != row['user_id']:
+            report.append(dict(entry, result='invalid', error=f"Order {row['order_id']} not found for this user"))
+        elif key in existing or key in seen:
+            report.append(dict(entry, result='duplicate'))
+        else:
+            seen.add(key)
+            accepted.append(row)
+
+    created = []
+    if accepted and not dry_run:
+        tokens = _encrypt_parallel([row['password'] for row in accepted], workers)
+        now = datetime.utcnow()
+        values = [{
+            'user_id': row['user_id'],
+            'order_id': row['order_id'],
+            'username': row['username'],
+            'email': row['email'],
+            'encrypted_password': token,
+            'niche': row['niche'],
+            'status': row['status'],
+            'current_day': 0,
+            'progress_percentage': 0,
+            'reels_viewed': 0,
+            'accounts_followed': 0,
+            'comments_left': 0,
+            'created_at': now,
+            'started_at': now if row['status'] == 'warming' else None,
+            'status_changed_at': now
+        } for row, token in zip(accepted, tokens)]
+        for start in range(0, len(values), IMPORT_CHUNK_SIZE):
+            chunk = values[start:start + IMPORT_CHUNK_SIZE]
+            ids = db.session.execute(
+                insert(Account).returning(Account.id, sort_by_parameter_order=True), chunk
+            ).scalars().all()
+            created.extend(zip(accepted[start:start + IMPORT_CHUNK_SIZE], ids))
+
+        bump_data_version({row['user_id'] for row in accepted})
+        db.session.commit()
+
+        for value, (row, account_id) in zip(values, created):
+            publish_account_change(row['user_id'], account_id, completed_at=None, **{
+                field: value[field] for field in PROGRESS_FIELDS if field in value})
+        invalidate_stats()
+
+    if dry_run:
+        report.extend({'row': row['row'], 'username': row['username'], 'result': 'created'} for row in accepted)
+    else:
+        report.extend({'row': row['row'], 'username': row['username'], 'result': 'created', 'id': account_id}
+                      for row, account_id in created)
+    report.sort(key=lambda entry: entry['row'])
+    summary = {result: sum(1 for entry in report if entry['result'] == result)
+               for result in ('created', 'duplicate', 'invalid')}
+    return dict(summary, dry_run=dry_run, rows=report)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    parser = argparse.ArgumentParser(description='Bulk import Instagram accounts from CSV or JSON')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'json'), help='default: from the file extension')
+    parser.add_argument('--user-id', type=int, help='owner for rows without a user_id')
+    parser.add_argument('--dry-run', action='store_true', help='validate and report without inserting')
+    parser.add_argument('--report', help='write the per-row report as JSON to this file')
+    args = parser.parse_args()
+
+    fmt = args.format or ('json' if args.path.endswith('.json') else 'csv')
+    with open(args.path, encoding='utf-8-sig') as f:
+        text = f.read()
+    with app.app_context():
+        try:
+            result = import_accounts(parse_rows(text, fmt), args.user_id, dry_run=args.dry_run)
+        except InvalidImport as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+
+    for entry in result['rows']:
+        if entry['result'] != 'created':
+            print(f"⚠️  Row {entry['row']} ({entry.get('username') or '?'}): {entry['result']}"
+                  + (f" - {entry['error']}" if entry.get('error') else ''))
+    verb = 'Would create' if args.dry_run else 'Created'
+    print(f"✅ {verb} {result['created']} account(s); {result['duplicate']} duplicate, {result['invalid']} invalid")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,164 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete, and_, or_
+
+from models import db, Account, WarmupJob
+
+# DB-backed lease queue for the warmup worker fleet.
+#
+# lease_jobs() claims a batch with one UPDATE ... WHERE id IN (SELECT ...
+# FOR UPDATE SKIP LOCKED) RETURNING. On Postgres, concurrent workers skip
+# each other's locked rows instead of queueing behind them; SQLite drops the
+# FOR UPDATE and relies on its single writer to make the statement atomic.
+# A lease that isn't heartbeated before lease_expires_at is claimable again,
+# and the old holder's lease_token stops matching, unless it has used up
+# MAX_ATTEMPTS: then the next lease call marks it failed instead.
+DEFAULT_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+MAX_LEASE_BATCH = 100
+MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+RETRY_DELAY_SECONDS = 600
+
+
+def _insert(table):
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def enqueue_jobs(sessions):
+    """Queue (account_id, session_index, due_ts) sessions; accounts with an active job are skipped.
+
+    Returns (jobs queued, ids of accounts whose sessions were dropped).
+
+    Sessions of accounts that were deleted or stopped warming since they were
+    scheduled are dropped rather than failing the batch. The remaining
+    accounts are locked FOR KEY SHARE until commit, so they can't be deleted
+    underneath the INSERT.
+    """
+    if not sessions:
+        return 0, set()
+    warming = set(db.session.execute(
+        select(Account.id)
+        .where(Account.id.in_({account_id for account_id, _, _ in sessions}), Account.status == 'warming')
+        .with_for_update(key_share=True)
+    ).scalars())
+    rows = [{
+        'account_id': account_id,
+        'session_index': index,
+        'run_at': datetime.utcfromtimestamp(due),
+        'status': 'queued',
+        'attempts': 0,
+        'created_at': datetime.utcnow()
+    } for account_id, index, due in sessions if account_id in warming]
+    dropped = {account_id for account_id, _, _ in sessions} - warming
+    if not rows:
+        db.session.commit()
+        return 0, dropped
+    result = db.session.execute(_insert(WarmupJob.__table__).on_conflict_do_nothing(), rows)
+    db.session.commit()
+    return result.rowcount, dropped
+
+
+def lease_jobs(worker_id, max_jobs=10, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Claim up to max_jobs due jobs for worker_id; returns their dicts"""
+    now = datetime.utcnow()
+    expired = and_(WarmupJob.status == 'leased', WarmupJob.lease_expires_at < now)
+    # A worker that died on its last attempt doesn't get the job re-leased
+    db.session.execute(
+        update(WarmupJob).where(expired, WarmupJob.attempts >= MAX_ATTEMPTS)
+        .values(status='failed', completed_at=now, lease_token=None, last_error='Lease expired')
+        .execution_options(synchronize_session=False)
+    )
+    claimable = select(WarmupJob.id).where(
+        or_(
+            and_(WarmupJob.status == 'queued', WarmupJob.run_at <= now),
+            and_(expired, WarmupJob.attempts < MAX_ATTEMPTS)
+        ),
+        WarmupJob.account_id.in_(select(Account.id).where(Account.status == 'warming'))
+    ).order_by(WarmupJob.run_at).limit(max(1, min(max_jobs, MAX_LEASE_BATCH))).with_for_update(skip_locked=True)
+
+    token = uuid.uuid4().hex
+    rows = db.session.execute(
+        update(WarmupJob)
+        .where(WarmupJob.id.in_(claimable.scalar_subquery()))
+        .values(status='leased', lease_token=token, lease_owner=worker_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=WarmupJob.attempts + 1)
+        .returning(WarmupJob.id, WarmupJob.account_id, WarmupJob.session_index,
+                   WarmupJob.run_at, WarmupJob.attempts, WarmupJob.lease_expires_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    return [{
+        'id': row.id,
+        'account_id': row.account_id,
+        'session_index': row.session_index,
+        'run_at': row.run_at.isoformat(),
+        'attempts': row.attempts,
+        'lease_token': token,
+        'lease_expires_at': row.lease_expires_at.isoformat()
+    } for row in sorted(rows, key=lambda r: r.run_at)]
+
+
+def _held(job_id, token):
+    return and_(WarmupJob.id == job_id, WarmupJob.status == 'leased', WarmupJob.lease_token == token)
+
+
+def heartbeat_jobs(jobs, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Extend leases; returns (extended ids, lost ids)"""
+    expires = datetime.utcnow() + timedelta(seconds=lease_seconds)
+    extended, lost = [], []
+    for job in jobs:
+        result = db.session.execute(
+            update(WarmupJob).where(_held(job['id'], job['lease_token']))
+            .values(lease_expires_at=expires)
+            .execution_options(synchronize_session=False)
+        )
+        (extended if result.rowcount else lost).append(job['id'])
+    db.session.commit()
+    return extended, lost
+
+
+def ack_jobs(jobs):
+    """Complete leased jobs: {'id', 'lease_token', 'success', 'error'}. Returns (acked ids, lost ids)."""
+    now = datetime.utcnow()
+    acked, lost = [], []
+    for job in jobs:
+        if job.get('success', True):
+            values = {'status': 'done', 'completed_at': now, 'lease_token': None, 'last_error': None}
+            result = db.session.execute(
+                update(WarmupJob).where(_held(job['id'], job['lease_token'])).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            # Failed attempts go back in the queue until MAX_ATTEMPTS
+            held = _held(job['id'], job['lease_token'])
+            retry = db.session.execute(
+                update(WarmupJob).where(held, WarmupJob.attempts < MAX_ATTEMPTS)
+                .values(status='queued', lease_token=None, lease_owner=None, lease_expires_at=None,
+                        run_at=now + timedelta(seconds=RETRY_DELAY_SECONDS), last_error=job.get('error'))
+                .execution_options(synchronize_session=False)
+            )
+            result = retry if retry.rowcount else db.session.execute(
+                update(WarmupJob).where(held)
+                .values(status='failed', completed_at=now, lease_token=None, last_error=job.get('error'))
+                .execution_options(synchronize_session=False)
+            )
+        (acked if result.rowcount else lost).append(job['id'])
+    db.session.commit()
+    return acked, lost
+
+
+def delete_account_jobs(account_ids):
+    """Delete the jobs of accounts about to be deleted (warmup_jobs references accounts without a cascade).
+
+    account_ids may be a list or a SELECT of account ids; the caller commits.
+    """
+    db.session.execute(
+        delete(WarmupJob).where(WarmupJob.account_id.in_(account_ids))
+        .execution_options(synchronize_session=False)
+    )
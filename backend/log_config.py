@@ -0,0 +1,150 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import traceback
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+# Structured, non-blocking logging. Request threads only put records on a
+# bounded in-memory queue (QueueHandler); a background QueueListener thread
+# formats them and writes to stdout. If the queue is full the record is
+# dropped and counted rather than blocking the request. Configuration:
+#   LOG_FORMAT      'json' (one object per line) or 'text' for local development
+#   LOG_LEVEL       root level, default INFO
+#   LOG_LEVELS      per-module overrides, e.g. "stripe_api=DEBUG,sqlalchemy.engine=WARNING"
+#   LOG_QUEUE_SIZE  records buffered before new ones are dropped
+# Every record logged during a request carries its request_id, taken from
+# an incoming X-Request-ID header or generated, and echoed on the response.
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        return f'{text}\n{record.exc}' if getattr(record, 'exc', None) else text
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Capture the request id and render message/traceback on the request
+        # thread; the listener thread sees a plain, picklable record
+        RequestIdFilter().filter(record)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc = ''.join(traceback.format_exception(*record.exc_info))
+        record.exc_info = record.exc_text = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_listener = None
+_configured_pid = None
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    """Route all logging through the queue; safe to call repeatedly and after fork"""
+    global _listener, _configured_pid
+    if _configured_pid == os.getpid():
+        return
+    if _listener is not None:
+        # Forked from a configured parent: its listener thread didn't survive the fork
+        _listener = None
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(TextFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+    for item in filter(None, (part.strip() for part in LOG_LEVELS.split(','))):
+        name, _, level = item.partition('=')
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    if _configured_pid is None:
+        atexit.register(_stop_listener)
+    _configured_pid = os.getpid()
+
+
+def _assign_request_id():
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    if g.get('request_id'):
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+
+def install(app):
+    """Configure logging and tag every request with a request id"""
+    configure_logging()
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
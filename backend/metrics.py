@@ -0,0 +1,274 @@
+import bisect
+import itertools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request performance metrics, exported as Prometheus text by
+# GET /api/admin/metrics. For every route (URL rule + method) we keep
+# histograms of wall time, SQL statement count and time, bcrypt time, Stripe
+# time and response size, plus a request counter by status.
+#
+# Recording goes to one of METRICS_SHARDS locked registries per process,
+# handed out round-robin to threads (or gevent greenlets) so they rarely
+# contend; the exporter sums the shards when scraped. The shard count is fixed,
+# so memory doesn't grow with the number of threads or connections served.
+# Numbers are per
+# gunicorn worker process and carry a `worker` (pid) label, so scrape each
+# worker or aggregate with sum without (worker).
+#
+# Streaming responses (SSE, exports) are measured up to the point the
+# response starts, not until the stream ends.
+#
+# PROFILE_SLOW_MS > 0 turns on a sampling profiler: a background thread
+# samples the stacks of in-flight requests every PROFILE_INTERVAL_MS, and
+# requests slower than PROFILE_SLOW_MS append their samples to
+# PROFILE_DIR/slow-<pid>.folded in folded-stack format (flamegraph.pl,
+# speedscope, inferno).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+METRICS_SHARDS = int(os.getenv('METRICS_SHARDS', '16'))
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp')
+PROFILE_MAX_SAMPLES = 2000
+
+PREFIX = 'warmup'
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'request_seconds': ('Request wall time', SECONDS_BUCKETS),
+    'sql_statements': ('SQL statements per request', COUNT_BUCKETS),
+    'sql_seconds': ('Time spent in SQL per request', SECONDS_BUCKETS),
+    'bcrypt_seconds': ('Time spent hashing/checking passwords per request', SECONDS_BUCKETS),
+    'stripe_seconds': ('Time spent calling Stripe per request', SECONDS_BUCKETS),
+    'response_bytes': ('Response body size', BYTES_BUCKETS),
+}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# (lock, {'histograms': {(metric, route, method): Histogram}, 'requests': {(route, method, status): count}})
+_shards = [(threading.Lock(), {'histograms': {}, 'requests': {}}) for _ in range(max(METRICS_SHARDS, 1))]
+_next_shard = itertools.count()
+_local = threading.local()
+
+
+def _shard():
+    """This thread's shard, assigned on first use"""
+    index = getattr(_local, 'shard', None)
+    if index is None:
+        index = _local.shard = next(_next_shard) % len(_shards)
+    return _shards[index]
+
+
+# Per-request accumulators live on the thread doing the work
+def _current():
+    return getattr(_local, 'request', None)
+
+
+@contextmanager
+def timer(kind):
+    """Add the block's duration to the current request's '<kind>_seconds' (bcrypt, stripe)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current = _current()
+        if current is not None:
+            current[kind] = current.get(kind, 0.0) + time.perf_counter() - start
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current()
+    started = conn.info.get('metrics_started')
+    if current is not None and started:
+        current['sql'] += time.perf_counter() - started.pop()
+        current['statements'] += 1
+
+
+def _route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def record(route, method, status, values):
+    lock, registry = _shard()
+    histograms = registry['histograms']
+    counter_key = (route, method, status)
+    with lock:
+        for metric, value in values.items():
+            key = (metric, route, method)
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(HISTOGRAMS[metric][1])
+            histogram.observe(value)
+        registry['requests'][counter_key] = registry['requests'].get(counter_key, 0) + 1
+
+
+def _before_request():
+    _local.request = {'start': time.perf_counter(), 'sql': 0.0, 'statements': 0}
+    if profiler:
+        profiler.track()
+
+
+def _after_request(response):
+    current = _current()
+    if current is None:
+        return response
+    _local.request = None
+    elapsed = time.perf_counter() - current['start']
+    values = {
+        'request_seconds': elapsed,
+        'sql_statements': current['statements'],
+        'sql_seconds': current['sql'],
+        'bcrypt_seconds': current.get('bcrypt', 0.0),
+        'stripe_seconds': current.get('stripe', 0.0),
+    }
+    if not response.is_streamed and response.content_length is not None:
+        values['response_bytes'] = response.content_length
+    route = _route()
+    record(route, request.method, response.status_code, values)
+    if profiler:
+        profiler.finish(f'{request.method} {route}', elapsed)
+    return response
+
+
+def _teardown_request(exc):
+    # Requests that never reached after_request (e.g. a client disconnect)
+    _local.request = None
+    if profiler:
+        profiler.untrack()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    merged, requests = {}, {}
+    for lock, registry in _shards:
+        with lock:
+            for key, histogram in registry['histograms'].items():
+                total = merged.get(key)
+                if total is None:
+                    total = merged[key] = Histogram(histogram.buckets)
+                total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+                total.sum += histogram.sum
+                total.count += histogram.count
+            for key, count in registry['requests'].items():
+                requests[key] = requests.get(key, 0) + count
+
+    worker = os.getpid()
+    lines = [f'# HELP {PREFIX}_requests_total Requests handled, by route, method and status',
+             f'# TYPE {PREFIX}_requests_total counter']
+    for (route, method, status), count in sorted(requests.items()):
+        lines.append(f'{PREFIX}_requests_total{{worker="{worker}",route="{_escape(route)}",'
+                     f'method="{method}",status="{status}"}} {count}')
+
+    for metric, (help_text, _) in HISTOGRAMS.items():
+        name = f'{PREFIX}_{metric}'
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (kind, route, method), histogram in sorted(merged.items()):
+            if kind != metric:
+                continue
+            labels = f'worker="{worker}",route="{_escape(route)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+class SlowRequestProfiler:
+    """Samples in-flight request stacks; keeps them for requests slower than the threshold"""
+
+    def __init__(self, slow_ms, interval_ms, directory):
+        self.slow_seconds = slow_ms / 1000
+        self.interval = interval_ms / 1000
+        self.path = os.path.join(directory, f'slow-{os.getpid()}.folded')
+        self._samples = {}  # thread id -> [folded stack, ...]
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        # Started lazily so it runs in the gunicorn worker, not the master
+        if self._thread is None or self._thread.pid != os.getpid():
+            self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+            self._thread.pid = os.getpid()
+            self._thread.start()
+
+    def track(self):
+        self._ensure_started()
+        self._samples[threading.get_ident()] = []
+
+    def untrack(self):
+        self._samples.pop(threading.get_ident(), None)
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for thread_id, samples in list(self._samples.items()):
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own or len(samples) >= PROFILE_MAX_SAMPLES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                    frame = frame.f_back
+                samples.append(';'.join(reversed(stack)))
+
+    def finish(self, label, elapsed):
+        samples = self._samples.pop(threading.get_ident(), None)
+        if not samples or elapsed < self.slow_seconds:
+            return
+        folded = {}
+        for stack in samples:
+            key = f'{label};{stack}'
+            folded[key] = folded.get(key, 0) + 1
+        with self._write_lock, open(self.path, 'a') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in folded.items())
+
+
+profiler = SlowRequestProfiler(PROFILE_SLOW_MS, PROFILE_INTERVAL_MS, PROFILE_DIR) if PROFILE_SLOW_MS > 0 else None
+
+
+def install(app):
+    """Record metrics for every request the app serves"""
+    if METRICS_ENABLED:
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        app.teardown_request(_teardown_request)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the Warmup.ai backend
+
+Each migration runs once, in order, and is recorded in the schema_migrations
+table. Migrations must be idempotent against databases that db.create_all()
+already built from the current models.
+
+Usage:
+  python migrations.py upgrade       # apply pending migrations
+  python migrations.py status        # list applied / pending versions
+  python migrations.py check-plans   # verify hot queries use their indexes
+"""
+
+import logging
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from models import StripeEvent, WarmupJob, Proxy, ReplicaMark
+
+logger = logging.getLogger(__name__)
+
+
+def add_column(table, column, ddl_type):
+    def migrate(conn):
+        columns = [col['name'] for col in inspect(conn).get_columns(table)]
+        if column not in columns:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+    return migrate
+
+
+def create_table(model):
+    def migrate(conn):
+        model.__table__.create(conn, checkfirst=True)
+    return migrate
+
+
+def run_all(*steps):
+    def migrate(conn):
+        for step in steps:
+            step(conn)
+    return migrate
+
+
+def create_indexes(*indexes):
+    def migrate(conn):
+        for name, table, columns in indexes:
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'))
+    return migrate
+
+
+# (version, description, migrate(conn)) - append only, never renumber
+MIGRATIONS = [
+    (1, 'add accounts.encrypted_password', add_column('accounts', 'encrypted_password', 'TEXT')),
+    (2, 'add accounts.email', add_column('accounts', 'email', 'VARCHAR(120)')),
+    (3, 'index orders/accounts on user and status', create_indexes(
+        ('ix_orders_user_id', 'orders', ['user_id']),
+        ('ix_orders_status', 'orders', ['status']),
+        ('ix_accounts_status', 'accounts', ['status']),
+        ('ix_accounts_user_id_username', 'accounts', ['user_id', 'username']),
+    )),
+    (4, 'stripe_events queue and order subscription ids', run_all(
+        create_table(StripeEvent),
+        add_column('orders', 'stripe_customer_id', 'VARCHAR(255)'),
+        add_column('orders', 'stripe_subscription_id', 'VARCHAR(255)'),
+        create_indexes(('ix_orders_stripe_subscription_id', 'orders', ['stripe_subscription_id'])),
+    )),
+    (5, 'add accounts.status_changed_at for the scheduler', run_all(
+        add_column('accounts', 'status_changed_at', 'TIMESTAMP'),
+        create_indexes(('ix_accounts_status_changed_at', 'accounts', ['status_changed_at'])),
+    )),
+    (6, 'warmup_jobs lease queue', create_table(WarmupJob)),
+    (7, 'proxies registry', run_all(
+        create_table(Proxy),
+        create_indexes(('ix_accounts_proxy_id', 'accounts', ['proxy_id'])),
+    )),
+    (8, 'add users.data_version for conditional GETs', add_column('users', 'data_version', 'INTEGER NOT NULL DEFAULT 0')),
+    (9, 'replica_marks for replica lag and read-your-writes', create_table(ReplicaMark)),
+    (10, 'add accounts.paused_at and paused_seconds', run_all(
+        add_column('accounts', 'paused_at', 'TIMESTAMP'),
+        add_column('accounts', 'paused_seconds', 'INTEGER NOT NULL DEFAULT 0'),
+    )),
+]
+
+
+def ensure_migrations_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(255) NOT NULL, '
+        'applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def applied_versions(conn):
+    ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def upgrade(engine):
+    """Apply pending migrations, each in its own transaction. Returns the versions applied."""
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+                {'v': version, 'd': description, 't': datetime.utcnow()}
+            )
+        logger.info('Applied migration %s: %s', version, description)
+        applied.append(version)
+    return applied
+
+
+# Hot queries and the index each must be able to use
+HOT_QUERIES = [
+    ('get_user_accounts',
+     'SELECT * FROM accounts WHERE user_id = :user_id',
+     {'user_id': 1}, ['ix_accounts_user_id_username']),
+    ('create_account duplicate check',
+     'SELECT id FROM accounts WHERE user_id = :user_id AND username = :username',
+     {'user_id': 1, 'username': 'example'}, ['ix_accounts_user_id_username']),
+    ('create_account paid order check',
+     'SELECT id FROM orders WHERE user_id = :user_id AND status = :status',
+     {'user_id': 1, 'status': 'paid'}, ['ix_orders_user_id', 'ix_orders_status']),
+    ('get_user_orders',
+     'SELECT * FROM orders WHERE user_id = :user_id',
+     {'user_id': 1}, ['ix_orders_user_id']),
+    ('admin orders status filter',
+     'SELECT id FROM orders WHERE status = :status',
+     {'status': 'paid'}, ['ix_orders_status']),
+    ('admin accounts status filter',
+     'SELECT id FROM accounts WHERE status = :status',
+     {'status': 'warming'}, ['ix_accounts_status']),
+]
+
+
+def explain(conn, sql, params):
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params)
+        return '\n'.join(str(row[-1]) for row in rows)
+    if conn.dialect.name == 'postgresql':
+        # Tiny tables make sequential scans cheaper; we only want to know the index is usable
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        rows = conn.execute(text(f'EXPLAIN {sql}'), params)
+        return '\n'.join(row[0] for row in rows)
+    raise RuntimeError(f'Query plan check not supported on {conn.dialect.name}')
+
+
+def check_plans(engine):
+    """Print the plan of each hot query; returns False if any misses its index"""
+    ok = True
+    with engine.begin() as conn:
+        for name, sql, params, indexes in HOT_QUERIES:
+            plan = explain(conn, sql, params)
+            used = [index for index in indexes if index in plan]
+            if used:
+                print(f"✅ {name}: uses {used[0]}")
+            else:
+                ok = False
+                print(f"❌ {name}: expected one of {indexes}\n{plan}")
+    return ok
+
+
+if __name__ == '__main__':
+    from app import app
+    from models import db
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    with app.app_context():
+        if command == 'upgrade':
+            db.create_all()
+            applied = upgrade(db.engine)
+            print(f"✅ Schema up to date ({len(applied)} migration(s) applied)")
+        elif command == 'status':
+            with db.engine.begin() as conn:
+                done = applied_versions(conn)
+            for version, description, _ in MIGRATIONS:
+                print(f"{'applied' if version in done else 'pending'}  {version:>3}  {description}")
+        elif command == 'check-plans':
+            sys.exit(0 if check_plans(db.engine) else 1)
+        else:
+            print(__doc__)
+            sys.exit(2)
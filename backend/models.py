@@ -1,37 +1,110 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, select, func, case, cast, literal, Integer
 from datetime import datetime
-import bcrypt
 import os
-from cryptography.fernet import Fernet
+import logging
+import threading
+from cryptography.fernet import Fernet, MultiFernet
 
-db = SQLAlchemy()
+import hashing
+
+# Bind key of the optional read replica (DATABASE_REPLICA_URL, see replicas.py)
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the replica while the request has g.db_replica set"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and getattr(clause, 'is_select', False)
+                and getattr(clause, '_for_update_arg', None) is None
+                and has_app_context() and g.get('db_replica')):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Password encryption for Instagram credentials
+#
+# ENCRYPTION_KEY holds one or more comma-separated Fernet keys. The first key
+# encrypts; every key is tried on decrypt, so a new key can be prepended and
+# old ciphertexts re-encrypted in the background with rotate_encryption_key.py.
+# Without ENCRYPTION_KEY the app refuses to start: a key generated per process
+# can't decrypt what other gunicorn workers encrypted, nor anything after a
+# restart. ALLOW_TEMPORARY_ENCRYPTION_KEY=true permits that for development.
+ALLOW_TEMPORARY_ENCRYPTION_KEY = os.getenv('ALLOW_TEMPORARY_ENCRYPTION_KEY', 'false').lower() in ('1', 'true', 'yes')
+_cipher = None
+_cipher_lock = threading.Lock()
+
+
+class MissingEncryptionKey(RuntimeError):
+    """ENCRYPTION_KEY is not configured"""
+
+
+def load_keys():
+    """Read the Fernet keys from ENCRYPTION_KEY (primary key first)"""
+    raw = os.getenv('ENCRYPTION_KEY', '')
+    return [k.strip().encode() for k in raw.split(',') if k.strip()]
+
 def get_cipher():
-    """Get Fernet cipher for encrypting Instagram passwords"""
-    key = os.getenv('ENCRYPTION_KEY')
-    if not key:
-        # Generate a key if none exists (for development)
-        key = Fernet.generate_key().decode()
-        print(f"WARNING: No ENCRYPTION_KEY set. Generated temporary key: {key}")
-        print("Add this to your environment variables!")
-    else:
-        key = key.encode() if isinstance(key, str) else key
-    return Fernet(key)
+    """Get the process-wide MultiFernet cipher for Instagram passwords"""
+    global _cipher
+    if _cipher is not None:
+        return _cipher
+    with _cipher_lock:
+        if _cipher is None:
+            keys = load_keys()
+            if not keys:
+                if not ALLOW_TEMPORARY_ENCRYPTION_KEY:
+                    raise MissingEncryptionKey(
+                        'ENCRYPTION_KEY is not set. Generate one with '
+                        '`python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"` '
+                        'or set ALLOW_TEMPORARY_ENCRYPTION_KEY=true for local development.')
+                # Generate a key once per process (for development) so that
+                # values encrypted by this process can still be decrypted
+                key = Fernet.generate_key()
+                logging.getLogger(__name__).warning(
+                    'No ENCRYPTION_KEY set; generated a temporary key for this process. '
+                    'Set ENCRYPTION_KEY or encrypted passwords will not survive a restart.')
+                keys = [key]
+            _cipher = MultiFernet([Fernet(k) for k in keys])
+    return _cipher
+
+def reset_cipher():
+    """Forget the cached cipher so the next call re-reads ENCRYPTION_KEY"""
+    global _cipher
+    with _cipher_lock:
+        _cipher = None
 
 def encrypt_password(password):
     """Encrypt Instagram password"""
     if not password:
         return None
-    cipher = get_cipher()
-    return cipher.encrypt(password.encode()).decode()
+    return get_cipher().encrypt(password.encode()).decode()
 
 def decrypt_password(encrypted_password):
     """Decrypt Instagram password"""
     if not encrypted_password:
         return None
+    return get_cipher().decrypt(encrypted_password.encode()).decode()
+
+def encrypt_many(passwords):
+    """Encrypt a batch of Instagram passwords (empty values stay None)"""
+    cipher = get_cipher()
+    return [cipher.encrypt(p.encode()).decode() if p else None for p in passwords]
+
+def decrypt_many(encrypted_passwords):
+    """Decrypt a batch of Instagram passwords (empty values stay None)"""
     cipher = get_cipher()
-    return cipher.decrypt(encrypted_password.encode()).decode()
+    return [cipher.decrypt(p.encode()).decode() if p else None for p in encrypted_passwords]
+
+def rotate_many(encrypted_passwords):
+    """Re-encrypt a batch of ciphertexts under the primary key"""
+    cipher = get_cipher()
+    return [cipher.rotate(p.encode()).decode() if p else None for p in encrypted_passwords]
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -41,15 +114,19 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), default='client')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # see versioning.py
     
     orders = db.relationship('Order', backref='user', lazy=True)
     accounts = db.relationship('Account', backref='user', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = hashing.hash_password(password)
     
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return hashing.check_password(password, self.password_hash)
+    
+    def password_needs_rehash(self):
+        return hashing.needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -65,12 +142,14 @@ class Order(db.Model):
     __tablename__ = 'orders'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     stripe_session_id = db.Column(db.String(255), unique=True)
     stripe_payment_id = db.Column(db.String(255))
+    stripe_customer_id = db.Column(db.String(255))
+    stripe_subscription_id = db.Column(db.String(255), index=True)
     plan = db.Column(db.String(50), nullable=False)
     amount = db.Column(db.Integer, nullable=False)
-    status = db.Column(db.String(20), default='pending')
+    status = db.Column(db.String(20), default='pending', index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -83,8 +162,78 @@ class Order(db.Model):
         }
 
 
+# Set by the Stripe webhook worker (see webhook_worker.SUBSCRIPTION_STATUSES) or by admins
+ORDER_STATUSES = ('pending', 'paid', 'past_due', 'cancelled', 'paused')
+
+
+# Warmup lifecycle. Same-status updates are always allowed.
+WARMUP_DAYS = 5
+ACCOUNT_STATUSES = ('pending', 'ready', 'warming', 'paused', 'completed', 'failed')
+STATUS_TRANSITIONS = {
+    'pending': {'ready', 'failed'},
+    'ready': {'warming', 'failed'},
+    'warming': {'ready', 'paused', 'completed', 'failed'},
+    'paused': {'warming', 'ready', 'failed'},
+    'completed': set(),
+    'failed': {'pending', 'ready'}
+}
+
+def can_transition(current, new):
+    return current == new or new in STATUS_TRANSITIONS.get(current or 'pending', set())
+
+# Time an account spends out of 'warming' after it started doesn't count
+# toward its plan: leaving 'warming' (other than to 'completed') stamps
+# paused_at, and going back adds the pause to paused_seconds. The scheduler
+# and compute_progress shift the plan by paused_seconds.
+def pause_changes(old_status, new_status, paused_at, paused_seconds, now):
+    """paused_at/paused_seconds values for a status change (empty if they don't change)"""
+    if new_status == old_status:
+        return {}
+    if new_status == 'warming':
+        if not paused_at:
+            return {}
+        return {'paused_at': None,
+                'paused_seconds': (paused_seconds or 0) + int((now - paused_at).total_seconds())}
+    if old_status == 'warming' and new_status != 'completed':
+        return {'paused_at': now}
+    return {}
+
+def pause_change_columns(new_status, now):
+    """pause_changes as SQL for a set-based UPDATE of accounts moving to new_status"""
+    if new_status == 'warming':
+        return {'paused_at': None,
+                'paused_seconds': func.coalesce(Account.paused_seconds, 0) + case(
+                    (Account.paused_at.is_not(None), seconds_since(Account.paused_at, now)), else_=0)}
+    if new_status != 'completed':
+        return {'paused_at': case((Account.status == 'warming', now), else_=Account.paused_at)}
+    return {}
+
+def seconds_since(column, now):
+    """Whole seconds from a DateTime column to now, in SQL"""
+    now = literal(now, db.DateTime)
+    if db.engine.dialect.name == 'postgresql':
+        return cast(func.extract('epoch', now - column), Integer)
+    return cast((func.julianday(now) - func.julianday(column)) * 86400, Integer)
+
+def compute_progress(status, started_at, now=None, paused_at=None, paused_seconds=0):
+    """(current_day, progress_percentage) for an account, from its warmup start time less its pauses"""
+    if status == 'completed':
+        return WARMUP_DAYS, 100
+    if not started_at:
+        return 0, 0
+    until = paused_at or now or datetime.utcnow()
+    elapsed = max(0.0, (until - started_at).total_seconds() - (paused_seconds or 0))
+    day_seconds = 24 * 60 * 60
+    current_day = min(WARMUP_DAYS, int(elapsed // day_seconds) + 1)
+    # Only an explicit 'completed' transition reaches 100%
+    percentage = min(99, int(elapsed * 100 // (WARMUP_DAYS * day_seconds)))
+    return current_day, percentage
+
+
 class Account(db.Model):
     __tablename__ = 'accounts'
+    # Also serves lookups by user_id alone (leftmost column)
+    __table_args__ = (db.Index('ix_accounts_user_id_username', 'user_id', 'username'),)
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -93,16 +242,19 @@ class Account(db.Model):
     email = db.Column(db.String(120))  # Instagram email (optional)
     encrypted_password = db.Column(db.Text)  # Encrypted Instagram password
     niche = db.Column(db.String(50), nullable=False)
-    status = db.Column(db.String(20), default='pending')
+    status = db.Column(db.String(20), default='pending', index=True)
     current_day = db.Column(db.Integer, default=0)
     progress_percentage = db.Column(db.Integer, default=0)
     reels_viewed = db.Column(db.Integer, default=0)
     accounts_followed = db.Column(db.Integer, default=0)
     comments_left = db.Column(db.Integer, default=0)
-    proxy_id = db.Column(db.String(100))
+    proxy_id = db.Column(db.String(100), index=True)  # Proxy.key
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     started_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
+    status_changed_at = db.Column(db.DateTime, index=True)  # lets the scheduler poll for pause/resume
+    paused_at = db.Column(db.DateTime)  # set while a started warmup is out of 'warming'
+    paused_seconds = db.Column(db.Integer, nullable=False, default=0)  # total of earlier pauses
     
     def to_dict(self):
         return {
@@ -119,3 +271,114 @@ class Account(db.Model):
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
+
+
+def owner_has_plan(plan):
+    """Condition for accounts whose owner has an order with this plan (accounts rarely carry order_id)"""
+    return select(Order.id).where(Order.user_id == Account.user_id, Order.plan == plan).exists()
+
+
+class ReplicaMark(db.Model):
+    """Replication heartbeat ('heartbeat') and admins' last writes ('user:<id>'), kept on the primary"""
+    __tablename__ = 'replica_marks'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    marked_at = db.Column(db.DateTime, nullable=False)
+
+
+class StripeEvent(db.Model):
+    """Webhook event accepted by /api/webhook/stripe, applied later by webhook_worker.py"""
+    __tablename__ = 'stripe_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(255), unique=True, nullable=False)  # Stripe's evt_... id
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, processing, done, ignored, failed
+    attempts = db.Column(db.Integer, default=0)
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+
+
+
+class Proxy(db.Model):
+    """A proxy accounts are driven through; assignment is handled by proxy_pool.py"""
+    __tablename__ = 'proxies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)  # value stored in Account.proxy_id
+    url = db.Column(db.String(255))
+    region = db.Column(db.String(50))
+    niches = db.Column(db.String(255))  # comma-separated affinity, empty = any niche
+    capacity = db.Column(db.Integer, nullable=False, default=5)
+    assigned_count = db.Column(db.Integer, nullable=False, default=0)
+    healthy = db.Column(db.Boolean, nullable=False, default=True)
+    draining = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def niche_list(self):
+        return [n.strip() for n in (self.niches or '').split(',') if n.strip()]
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'key': self.key,
+            'url': self.url,
+            'region': self.region,
+            'niches': self.niche_list(),
+            'capacity': self.capacity,
+            'assigned_count': self.assigned_count,
+            'healthy': self.healthy,
+            'draining': self.draining,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class WarmupJob(db.Model):
+    """One warmup session for an account, leased to an external worker (see job_queue.py)"""
+    __tablename__ = 'warmup_jobs'
+    __table_args__ = (
+        db.Index('ix_warmup_jobs_status_run_at', 'status', 'run_at'),
+        # At most one queued/leased job per Instagram account, so it is never driven twice
+        db.Index('uq_warmup_jobs_active_account', 'account_id', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'leased')"),
+                 postgresql_where=db.text("status IN ('queued', 'leased')")),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
+    session_index = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), default='queued')  # queued, leased, done, failed
+    lease_token = db.Column(db.String(64))
+    lease_owner = db.Column(db.String(100))
+    lease_expires_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'session_index': self.session_index,
+            'run_at': self.run_at.isoformat(),
+            'status': self.status,
+            'lease_token': self.lease_token,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'attempts': self.attempts
+        }
+
+@event.listens_for(Account.status, 'set')
+def stamp_status_change(account, value, oldvalue, initiator):
+    if value != oldvalue:
+        now = datetime.utcnow()
+        account.status_changed_at = now
+        if isinstance(oldvalue, str):
+            for field, change in pause_changes(oldvalue, value, account.paused_at,
+                                               account.paused_seconds, now).items():
+                setattr(account, field, change)
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, inspect
+
+from models import Account
+
+# In-process change feed for account progress, consumed by the SSE stream in
+# app.py. Changes are captured from ORM flushes and published on commit; code
+# that updates accounts with bulk SQL calls publish_account_change() itself.
+#
+# Event ids are '<epoch>-<seq>'. The epoch identifies this process, so a
+# client resuming against another worker (or after a restart) gets a fresh
+# snapshot instead of silently missing events.
+HISTORY_SIZE = int(os.getenv('NOTIFIER_HISTORY', '10000'))
+
+PROGRESS_FIELDS = (
+    'status', 'current_day', 'progress_percentage', 'reels_viewed',
+    'accounts_followed', 'comments_left', 'started_at', 'completed_at'
+)
+
+
+class ChangeNotifier:
+    def __init__(self, history=HISTORY_SIZE):
+        self.epoch = f'{int(time.time() * 1000):x}'
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._events = deque(maxlen=history)  # (seq, user_id, data)
+        self._waiters = {}  # user_id -> set of threading.Event
+
+    def publish(self, user_id, data):
+        with self._lock:
+            self._seq += 1
+            self._events.append((self._seq, user_id, data))
+            waiters = list(self._waiters.get(user_id, ()))
+        for waiter in waiters:
+            waiter.set()
+
+    def event_id(self, seq):
+        return f'{self.epoch}-{seq}'
+
+    def parse_event_id(self, event_id):
+        """Sequence number for an id issued by this process, else None"""
+        epoch, _, seq = (event_id or '').partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def current_seq(self):
+        with self._lock:
+            return self._seq
+
+    def since(self, user_id, seq):
+        """(events for user_id after seq, complete). complete is False if history was trimmed past seq."""
+        with self._lock:
+            if seq > self._seq:
+                return [], False
+            complete = not self._events or self._events[0][0] <= seq + 1
+            events = [(s, data) for s, uid, data in self._events if s > seq and uid == user_id]
+        return events, complete
+
+    def subscribe(self, user_id):
+        waiter = threading.Event()
+        with self._lock:
+            self._waiters.setdefault(user_id, set()).add(waiter)
+        return waiter
+
+    def unsubscribe(self, user_id, waiter):
+        with self._lock:
+            waiters = self._waiters.get(user_id)
+            if waiters:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[user_id]
+
+
+notifier = ChangeNotifier()
+
+
+def serialize_progress(values):
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value for key, value in values.items()}
+
+
+def publish_account_change(user_id, account_id, **fields):
+    notifier.publish(user_id, serialize_progress(dict(fields, id=account_id)))
+
+
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault('account_changes', [])
+    for obj in session.new:
+        if isinstance(obj, Account):
+            pending.append((obj.user_id, obj.id, {f: getattr(obj, f) for f in PROGRESS_FIELDS}))
+    for obj in session.dirty:
+        if isinstance(obj, Account):
+            state = inspect(obj)
+            changed = {f: getattr(obj, f) for f in PROGRESS_FIELDS if state.attrs[f].history.has_changes()}
+            if changed:
+                pending.append((obj.user_id, obj.id, changed))
+    for obj in session.deleted:
+        if isinstance(obj, Account):
+            pending.append((obj.user_id, obj.id, {'deleted': True}))
+
+
+def _publish_changes(session):
+    for user_id, account_id, fields in session.info.pop('account_changes', []):
+        publish_account_change(user_id, account_id, **fields)
+
+
+def _discard_changes(session):
+    session.info.pop('account_changes', None)
+
+
+def install(session):
+    """Hook the notifier into a (scoped) session's flush/commit cycle"""
+    if not event.contains(session, 'after_flush', _collect_changes):
+        event.listen(session, 'after_flush', _collect_changes)
+        event.listen(session, 'after_commit', _publish_changes)
+        event.listen(session, 'after_rollback', _discard_changes)
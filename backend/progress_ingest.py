@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from sqlalchemy import select, update, func
+
+from models import db, Account, can_transition, compute_progress, pause_changes, ACCOUNT_STATUSES
+from notifier import publish_account_change, PROGRESS_FIELDS
+from versioning import bump_data_version
+
+# Progress reports from the warmup worker fleet. A batch may touch many
+# accounts; each account gets one guarded UPDATE (counters as x = x + :n) and
+# the whole batch commits as one transaction.
+COUNTER_FIELDS = ('reels_viewed', 'accounts_followed', 'comments_left')
+MAX_BATCH_SIZE = 1000
+
+
+class IngestError(ValueError):
+    """The batch as a whole is malformed"""
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def merge_updates(updates):
+    """Validate entries and fold several reports for one account into one"""
+    if not isinstance(updates, list) or not updates:
+        raise IngestError('updates must be a non-empty list')
+    if len(updates) > MAX_BATCH_SIZE:
+        raise IngestError(f'At most {MAX_BATCH_SIZE} updates per batch')
+
+    merged = {}
+    for entry in updates:
+        if not isinstance(entry, dict) or not _is_int(entry.get('account_id')):
+            raise IngestError('Each update needs an integer account_id')
+        item = merged.setdefault(entry['account_id'], {field: 0 for field in COUNTER_FIELDS})
+        for field in COUNTER_FIELDS:
+            value = entry.get(field, 0)
+            if not _is_int(value) or value < 0:
+                raise IngestError(f'{field} must be a non-negative integer')
+            item[field] += value
+        if 'status' in entry:
+            if entry['status'] not in ACCOUNT_STATUSES:
+                raise IngestError(f"Unknown status: {entry['status']}")
+            item['status'] = entry['status']
+    return merged
+
+
+def apply_progress_batch(updates, now=None):
+    """Apply a batch of counter increments / status transitions.
+
+    Returns one result per account: applied, not_found, invalid_transition or
+    conflict (the status changed underneath us; the worker should re-report).
+    """
+    now = now or datetime.utcnow()
+    merged = merge_updates(updates)
+
+    current = {
+        row.id: row for row in db.session.execute(
+            select(Account.id, Account.user_id, Account.status, Account.started_at,
+                   Account.paused_at, Account.paused_seconds)
+            .where(Account.id.in_(merged))
+        )
+    }
+
+    results, applied, status_changed = [], [], False
+    for account_id, item in merged.items():
+        row = current.get(account_id)
+        if row is None:
+            results.append({'account_id': account_id, 'result': 'not_found'})
+            continue
+        new_status = item.get('status', row.status)
+        if not can_transition(row.status, new_status):
+            results.append({'account_id': account_id, 'result': 'invalid_transition',
+                            'error': f'Cannot move from {row.status} to {new_status}'})
+            continue
+
+        values = {field: func.coalesce(getattr(Account, field), 0) + item[field]
+                  for field in COUNTER_FIELDS if item[field]}
+        started_at = row.started_at
+        pause = {'paused_at': row.paused_at, 'paused_seconds': row.paused_seconds}
+        if new_status != row.status:
+            values['status'] = new_status
+            values['status_changed_at'] = now
+            if new_status == 'warming' and not started_at:
+                started_at = values['started_at'] = now
+            if new_status == 'completed':
+                values['completed_at'] = now
+            changes = pause_changes(row.status, new_status, row.paused_at, row.paused_seconds, now)
+            values.update(changes)
+            pause.update(changes)
+        values['current_day'], values['progress_percentage'] = compute_progress(new_status, started_at, now, **pause)
+
+        # Guard on the status we validated against so concurrent transitions can't interleave
+        result = db.session.execute(
+            update(Account)
+            .where(Account.id == account_id, Account.status == row.status)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            results.append({'account_id': account_id, 'result': 'conflict'})
+            continue
+        status_changed = status_changed or new_status != row.status
+        applied.append(account_id)
+        results.append({'account_id': account_id, 'result': 'applied'})
+
+    changes = []
+    if applied:
+        columns = [getattr(Account, field) for field in PROGRESS_FIELDS]
+        changes = db.session.execute(
+            select(Account.id, Account.user_id, *columns).where(Account.id.in_(applied))
+        ).all()
+        bump_data_version(row.user_id for row in changes)
+    db.session.commit()
+
+    for row in changes:
+        fields = row._asdict()
+        publish_account_change(fields.pop('user_id'), fields.pop('id'), **fields)
+    return results, status_changed
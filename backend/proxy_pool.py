@@ -0,0 +1,274 @@
+import heapq
+import os
+import threading
+import time
+
+from sqlalchemy import select, update, func, case
+
+from models import db, Account, Proxy
+
+# Least-loaded proxy assignment.
+#
+# Each worker keeps an in-memory index: one min-heap of (load ratio, proxy id,
+# version) per (region, niche) affinity bucket, with '*' buckets for "any".
+# Updates push a fresh entry and bump the proxy's version, so outdated entries
+# are skipped when they reach the top (O(log n) per operation, no table scan).
+#
+# The database stays authoritative: capacity is enforced by a guarded
+# UPDATE ... SET assigned_count = assigned_count + 1 WHERE assigned_count < capacity,
+# the index is refreshed from the returned count, and it is reloaded wholesale
+# every PROXY_INDEX_TTL seconds to pick up other workers' assignments.
+PROXY_INDEX_TTL = float(os.getenv('PROXY_INDEX_TTL', '30'))
+ANY = '*'
+
+
+class NoProxyAvailable(Exception):
+    """No healthy proxy with spare capacity matches the account"""
+
+
+class ProxyIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heaps = {}     # (region, niche) -> [(load, proxy_id, version)]
+        self._proxies = {}   # proxy_id -> dict(key, region, niches, capacity, assigned, version)
+        self._loaded_at = 0.0
+
+    @staticmethod
+    def _buckets(info):
+        niches = info['niches'] or [ANY]
+        regions = {info['region'] or ANY, ANY}
+        return [(region, niche) for region in regions for niche in niches]
+
+    def _push(self, proxy_id):
+        info = self._proxies[proxy_id]
+        info['version'] += 1
+        if not info['available'] or info['assigned'] >= info['capacity']:
+            return
+        entry = (info['assigned'] / info['capacity'], proxy_id, info['version'])
+        for bucket in self._buckets(info):
+            heapq.heappush(self._heaps.setdefault(bucket, []), entry)
+
+    def load(self):
+        """Rebuild the index from the proxies table (one query)"""
+        rows = db.session.execute(select(Proxy)).scalars().all()
+        with self._lock:
+            self._heaps, self._proxies = {}, {}
+            for proxy in rows:
+                self._proxies[proxy.id] = {
+                    'key': proxy.key,
+                    'region': proxy.region,
+                    'niches': proxy.niche_list(),
+                    'capacity': max(proxy.capacity, 1),
+                    'assigned': proxy.assigned_count,
+                    'available': proxy.healthy and not proxy.draining,
+                    'version': 0
+                }
+                self._push(proxy.id)
+            self._loaded_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if time.monotonic() - self._loaded_at > PROXY_INDEX_TTL:
+            self.load()
+
+    def update(self, proxy_id, assigned=None, available=None):
+        with self._lock:
+            info = self._proxies.get(proxy_id)
+            if info is None:
+                return
+            if assigned is not None:
+                info['assigned'] = assigned
+            if available is not None:
+                info['available'] = available
+            self._push(proxy_id)
+
+    def _top(self, bucket, exclude):
+        heap = self._heaps.get(bucket)
+        skipped = []
+        best = None
+        while heap:
+            load, proxy_id, version = heap[0]
+            info = self._proxies.get(proxy_id)
+            if info is None or info['version'] != version:
+                heapq.heappop(heap)
+                continue
+            if proxy_id in exclude:
+                skipped.append(heapq.heappop(heap))
+                continue
+            best = (load, proxy_id)
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return best
+
+    def best(self, region=None, niche=None, exclude=()):
+        """Least-loaded available proxy id for the affinity, or None"""
+        region = region or ANY
+        with self._lock:
+            candidates = [self._top((region, n), exclude) for n in ({niche, ANY} if niche else {ANY})]
+        candidates = [c for c in candidates if c]
+        return min(candidates)[1] if candidates else None
+
+    def assigned(self, proxy_id):
+        with self._lock:
+            return self._proxies[proxy_id]['assigned']
+
+
+index = ProxyIndex()
+
+
+def _adjust(key, delta):
+    """Change a proxy's assigned_count by key, keeping the index in step"""
+    query = update(Proxy).where(Proxy.key == key)
+    if delta < 0:
+        query = query.where(Proxy.assigned_count >= -delta)
+    row = db.session.execute(
+        query.values(assigned_count=Proxy.assigned_count + delta)
+        .returning(Proxy.id, Proxy.assigned_count)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row:
+        index.update(row.id, assigned=row.assigned_count)
+
+
+def release(key):
+    """An account left proxy `key` (reassigned, deleted or changed by hand)"""
+    if key:
+        _adjust(key, -1)
+
+
+def claim(key):
+    """An account was put on proxy `key` by hand; may exceed capacity"""
+    if key:
+        _adjust(key, 1)
+
+
+def release_many(counts):
+    """Accounts left proxies in bulk, {key: number of accounts}, in one UPDATE"""
+    counts = {key: n for key, n in counts.items() if key and n}
+    if not counts:
+        return
+    delta = case(counts, value=Proxy.key, else_=0)
+    rows = db.session.execute(
+        update(Proxy).where(Proxy.key.in_(counts))
+        .values(assigned_count=case((Proxy.assigned_count > delta, Proxy.assigned_count - delta), else_=0))
+        .returning(Proxy.id, Proxy.assigned_count)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for row in rows:
+        index.update(row.id, assigned=row.assigned_count)
+
+
+def claim_many(key, n):
+    """Reserve room for n more accounts on proxy `key` (caller commits and moves them).
+
+    Unlike claim(), the proxy must be healthy, not draining and have the capacity.
+    """
+    row = db.session.execute(
+        update(Proxy)
+        .where(Proxy.key == key, Proxy.assigned_count + n <= Proxy.capacity,
+               Proxy.healthy.is_(True), Proxy.draining.is_(False))
+        .values(assigned_count=Proxy.assigned_count + n)
+        .returning(Proxy.id, Proxy.assigned_count)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        raise NoProxyAvailable(f'Proxy {key!r} does not exist, is unavailable or has no room for {n} account(s)')
+    index.update(row.id, assigned=row.assigned_count)
+
+
+def assign_proxy(account, region=None):
+    """Move an account to the least-loaded healthy proxy matching its niche (caller commits)"""
+    index.ensure_fresh()
+    tried = set()
+    for _ in range(2):
+        while True:
+            proxy_id = index.best(region, account.niche, exclude=tried)
+            if proxy_id is None:
+                break
+            row = db.session.execute(
+                update(Proxy)
+                .where(Proxy.id == proxy_id, Proxy.assigned_count < Proxy.capacity,
+                       Proxy.healthy.is_(True), Proxy.draining.is_(False))
+                .values(assigned_count=Proxy.assigned_count + 1)
+                .returning(Proxy.key, Proxy.assigned_count)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if row is None:
+                # Another worker filled it or it went unhealthy; our view was stale
+                tried.add(proxy_id)
+                continue
+            index.update(proxy_id, assigned=row.assigned_count)
+            if account.proxy_id and account.proxy_id != row.key:
+                release(account.proxy_id)
+            account.proxy_id = row.key
+            return row.key
+        # Every candidate we knew about was stale: reload once and retry
+        index.load()
+    raise NoProxyAvailable(f'No healthy proxy with capacity for niche {account.niche!r}')
+
+
+def set_proxy_state(proxy, healthy=None, draining=None, capacity=None):
+    """Update a proxy's health/drain/capacity and refresh the index (caller commits)"""
+    if healthy is not None:
+        proxy.healthy = healthy
+    if draining is not None:
+        proxy.draining = draining
+    if capacity is not None:
+        proxy.capacity = capacity
+    db.session.flush()
+    index.load()
+
+
+def drain_proxy(proxy, chunk_size=500):
+    """Mark a proxy draining and move its accounts to other proxies in bulk (caller commits).
+
+    Returns (moved, unplaced): accounts that could not be placed stay where they are.
+    """
+    set_proxy_state(proxy, draining=True)
+    moved, unplaced, last_id = 0, 0, 0
+    while True:
+        rows = db.session.execute(
+            select(Account.id, Account.niche)
+            .where(Account.proxy_id == proxy.key, Account.id > last_id)
+            .order_by(Account.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        # Plan the whole chunk in memory against the index, then write it set-based
+        plan = {}
+        for row in rows:
+            target = index.best(proxy.region, row.niche)
+            if target is None:
+                unplaced += 1
+                continue
+            plan.setdefault(target, []).append(row.id)
+            index.update(target, assigned=index.assigned(target) + 1)
+
+        for target, account_ids in plan.items():
+            n = len(account_ids)
+            row = db.session.execute(
+                update(Proxy)
+                .where(Proxy.id == target, Proxy.assigned_count + n <= Proxy.capacity)
+                .values(assigned_count=Proxy.assigned_count + n)
+                .returning(Proxy.key, Proxy.assigned_count)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if row is None:
+                # Capacity changed under us; leave these accounts for the next drain
+                unplaced += n
+                continue
+            db.session.execute(
+                update(Account).where(Account.id.in_(account_ids)).values(proxy_id=row.key)
+                .execution_options(synchronize_session=False)
+            )
+            index.update(target, assigned=row.assigned_count)
+            moved += n
+
+    remaining = db.session.execute(
+        select(func.count(Account.id)).where(Account.proxy_id == proxy.key)
+    ).scalar()
+    proxy.assigned_count = remaining
+    index.load()
+    return moved, unplaced
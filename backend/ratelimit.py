@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify
+
+# Rate limiting and load shedding for the unauthenticated routes that spend
+# bcrypt or Stripe time (login, register, guest checkout). Everything here
+# runs before the route body, so a rejected request costs no hashing.
+#
+# Each route has token buckets keyed by client IP and by the submitted email:
+# a bucket holds up to BURST tokens and refills PER_MINUTE tokens a minute.
+# The in-memory store is split into RATE_LIMIT_SHARDS independently locked
+# LRU maps holding at most RATE_LIMIT_MAX_KEYS buckets in total; evicting an
+# idle bucket only forgets a client that would have been refilled anyway.
+#
+# With RATE_LIMIT_BACKEND=redis (requires the redis package and REDIS_URL)
+# buckets are shared across gunicorn workers and hosts. If Redis is missing
+# or unreachable the limiter falls back to the local store rather than
+# failing requests.
+#
+# SHED_MAX_INFLIGHT caps how many of these requests a worker process runs at
+# once; beyond that they get an immediate 503 instead of queueing for bcrypt.
+# Per-IP buckets are only enforced once TRUSTED_PROXIES says how many
+# reverse proxies sit in front of the app (0 when clients connect directly),
+# so the client IP comes from X-Forwarded-For (see create_app). Until then
+# every client behind a proxy would share the proxy's bucket; the per-email
+# buckets apply either way.
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SHARDS = int(os.getenv('RATE_LIMIT_SHARDS', '16'))
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+RATE_LIMIT_IP_BURST = int(os.getenv('RATE_LIMIT_IP_BURST', '20'))
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv('RATE_LIMIT_IP_PER_MINUTE', '30'))
+RATE_LIMIT_EMAIL_BURST = int(os.getenv('RATE_LIMIT_EMAIL_BURST', '5'))
+RATE_LIMIT_EMAIL_PER_MINUTE = float(os.getenv('RATE_LIMIT_EMAIL_PER_MINUTE', '5'))
+SHED_MAX_INFLIGHT = int(os.getenv('SHED_MAX_INFLIGHT', '16'))
+REDIS_URL = os.getenv('REDIS_URL')
+IP_LIMITS_ENABLED = os.getenv('TRUSTED_PROXIES', '').strip() != ''
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBuckets:
+    """Token buckets in sharded, size-bounded LRU maps"""
+
+    def __init__(self, shards=RATE_LIMIT_SHARDS, max_keys=RATE_LIMIT_MAX_KEYS):
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(max(shards, 1))]
+        self._per_shard = max(max_keys // len(self._shards), 1)
+
+    def take(self, key, burst, per_second, now=None):
+        """Spend one token; returns seconds until one is available (0 if allowed)"""
+        now = time.monotonic() if now is None else now
+        lock, buckets = self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [float(burst), now]
+                if len(buckets) > self._per_shard:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_second)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / per_second
+
+    def __len__(self):
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+# Same algorithm as MemoryBuckets.take, atomically in Redis. Returns retry-after in ms.
+_REDIS_TAKE = """
+local burst, per_ms, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens, ts = tonumber(state[1]), tonumber(state[2])
+if tokens == nil then
+  tokens = burst
+else
+  tokens = math.min(burst, tokens + (now - ts) * per_ms)
+end
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = math.ceil((1 - tokens) / per_ms) end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / per_ms))
+return wait
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared through Redis, falling back to a local store on errors"""
+
+    def __init__(self, client, fallback):
+        self._take = client.register_script(_REDIS_TAKE)
+        self._fallback = fallback
+
+    def take(self, key, burst, per_second):
+        try:
+            wait_ms = self._take(keys=[f'ratelimit:{key}'],
+                                 args=[burst, per_second / 1000, int(time.time() * 1000)])
+            return int(wait_ms) / 1000
+        except Exception:
+            return self._fallback.take(key, burst, per_second)
+
+
+def build_store():
+    memory = MemoryBuckets()
+    if RATE_LIMIT_BACKEND != 'redis':
+        return memory
+    try:
+        import redis
+    except ImportError:
+        logger.warning('RATE_LIMIT_BACKEND=redis but the redis package is not installed; using per-process limits')
+        return memory
+    if not REDIS_URL:
+        logger.warning('RATE_LIMIT_BACKEND=redis but REDIS_URL is not set; using per-process limits')
+        return memory
+    client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.1, socket_connect_timeout=0.1)
+    return RedisBuckets(client, memory)
+
+
+store = build_store()
+
+
+class LoadShedder:
+    """Counts in-flight requests and refuses new ones past a limit, without waiting"""
+
+    def __init__(self, max_inflight=SHED_MAX_INFLIGHT):
+        self.max_inflight = max_inflight
+        self._lock = threading.Lock()
+        self.inflight = 0
+
+    def try_enter(self):
+        with self._lock:
+            if self.inflight >= self.max_inflight:
+                return False
+            self.inflight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.inflight -= 1
+
+
+shedder = LoadShedder()
+
+
+def _too_many(retry_after):
+    response = jsonify({'error': 'Too many requests, please retry later'})
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response, 429
+
+
+def protected(scope):
+    """Rate limit a route by client IP (once TRUSTED_PROXIES is set) and JSON 'email', and shed load past SHED_MAX_INFLIGHT"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
+
+            if IP_LIMITS_ENABLED:
+                wait = store.take(f'{scope}:ip:{request.remote_addr}',
+                                  RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE / 60)
+                if wait:
+                    return _too_many(wait)
+            data = request.get_json(silent=True)
+            email = data.get('email') if isinstance(data, dict) else None
+            if isinstance(email, str) and email.strip():
+                wait = store.take(f'{scope}:email:{email.strip().lower()}',
+                                  RATE_LIMIT_EMAIL_BURST, RATE_LIMIT_EMAIL_PER_MINUTE / 60)
+                if wait:
+                    return _too_many(wait)
+
+            if not shedder.try_enter():
+                response = jsonify({'error': 'Server busy, please retry shortly'})
+                response.headers['Retry-After'] = '1'
+                return response, 503
+            try:
+                return f(*args, **kwargs)
+            finally:
+                shedder.leave()
+        return decorated
+    return decorator
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Read-replica routing for admin and reporting reads
+
+With DATABASE_REPLICA_URL set, the app gets a second SQLAlchemy bind
+('replica'). Routes decorated with @replica_read run their plain SELECTs
+there through models.RoutingSession; writes, SELECT ... FOR UPDATE and every
+other route keep using the primary. A request is only sent to the replica if:
+
+- the replica is fresh: its lag, checked at most every REPLICA_LAG_CHECK_SECONDS
+  per worker, is under REPLICA_MAX_LAG_SECONDS. REPLICA_LAG_SOURCE picks how:
+    postgres   pg_last_xact_replay_timestamp() on a streaming standby
+               (0 when it has replayed everything it received)
+    heartbeat  the replica's copy of a heartbeat row the check writes on the
+               primary; works with any replication, including copied SQLite files
+    auto       postgres for a Postgres replica, heartbeat otherwise (default)
+  Any error reading the lag counts as too stale.
+- the caller hasn't written recently: successful admin POST/PUT/PATCH/DELETE
+  requests record the admin's write time on the primary, and that admin's
+  replica reads go to the primary until the replica is guaranteed to have
+  caught up (REPLICA_MAX_LAG_SECONDS + REPLICA_LAG_CHECK_SECONDS). The mark is
+  in the database, so it holds across gunicorn workers and hosts.
+
+Usage (from backend/):
+  python replicas.py status   # replica lag and whether reads would use it
+  python replicas.py copy     # SQLite only: snapshot the primary into the replica
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import g, request
+from sqlalchemy import select, text
+
+from db_config import engine_options
+from models import db, ReplicaMark, REPLICA_BIND
+
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', '1'))
+REPLICA_LAG_SOURCE = os.getenv('REPLICA_LAG_SOURCE', 'auto')
+
+HEARTBEAT = 'heartbeat'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+# Only admin routes read from the replica, so only admins' writes are marked
+STICKY_ROLES = ('admin',)
+
+_PG_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+logger = logging.getLogger(__name__)
+
+
+def replica_url():
+    """DATABASE_REPLICA_URL normalised like DATABASE_URL, or None"""
+    url = DATABASE_REPLICA_URL
+    if url and url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url or None
+
+
+def enabled():
+    return REPLICA_BIND in db.engines
+
+
+def _upsert(name, marked_at):
+    """Set a replica_marks row on the primary, in its own transaction"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(ReplicaMark.__table__).values(name=name, marked_at=marked_at)
+    with db.engine.begin() as conn:
+        conn.execute(statement.on_conflict_do_update(index_elements=['name'], set_={'marked_at': marked_at}))
+
+
+def lag_source():
+    if REPLICA_LAG_SOURCE != 'auto':
+        return REPLICA_LAG_SOURCE
+    return 'postgres' if db.engines[REPLICA_BIND].dialect.name == 'postgresql' else 'heartbeat'
+
+
+def measure_lag():
+    """Seconds the replica may be behind the primary (an upper bound; inf if unknown)"""
+    replica = db.engines[REPLICA_BIND]
+    if lag_source() == 'postgres':
+        with replica.connect() as conn:
+            return float(conn.execute(_PG_LAG).scalar() or 0)
+    # The replica holds everything up to the newest heartbeat it has replayed.
+    # Right after an idle spell that beat is old, so the first check is
+    # conservative until the beat written below has replicated.
+    now = datetime.utcnow()
+    with replica.connect() as conn:
+        beat = conn.execute(select(ReplicaMark.marked_at).where(ReplicaMark.name == HEARTBEAT)).scalar()
+    _upsert(HEARTBEAT, now)
+    return (now - beat).total_seconds() if beat else float('inf')
+
+
+class LagGuard:
+    """Caches the measured replica lag for REPLICA_LAG_CHECK_SECONDS; one thread measures at a time"""
+
+    def __init__(self, interval=REPLICA_LAG_CHECK_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._lag = float('inf')
+        self._checked_at = 0.0
+
+    def lag(self):
+        if time.monotonic() - self._checked_at >= self.interval and self._lock.acquire(blocking=False):
+            try:
+                self._lag = measure_lag()
+            except Exception as e:
+                logger.warning('Replica lag check failed; reading from the primary', extra={'error': str(e)})
+                self._lag = float('inf')
+            finally:
+                self._checked_at = time.monotonic()
+                self._lock.release()
+        return self._lag
+
+    def fresh(self):
+        return self.lag() <= REPLICA_MAX_LAG_SECONDS
+
+
+guard = LagGuard()
+
+
+def sticky_window():
+    return timedelta(seconds=REPLICA_MAX_LAG_SECONDS + REPLICA_LAG_CHECK_SECONDS)
+
+
+def wrote_recently(user_id):
+    """Whether the user wrote recently enough that the replica might not show it (one primary lookup)"""
+    marked_at = db.session.execute(
+        select(ReplicaMark.marked_at).where(ReplicaMark.name == f'user:{user_id}')
+    ).scalar()
+    return marked_at is not None and marked_at > datetime.utcnow() - sticky_window()
+
+
+def use_replica():
+    if not enabled() or not guard.fresh():
+        return False
+    claims = g.get('current_claims')
+    return not (claims and wrote_recently(claims['user_id']))
+
+
+def replica_read(f):
+    """Serve a read-only route's SELECTs from the replica when it is fresh enough for the caller.
+
+    Goes under the auth decorator so the caller is known.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.db_replica = use_replica()
+        return f(*args, **kwargs)
+    return decorated
+
+
+def _mark_write(response):
+    claims = g.get('current_claims')
+    if (claims and claims.get('role') in STICKY_ROLES and request.method in WRITE_METHODS
+            and response.status_code < 400):
+        try:
+            _upsert(f"user:{claims['user_id']}", datetime.utcnow())
+        except Exception as e:
+            logger.warning('Could not record write for replica stickiness', extra={'error': str(e)})
+    return response
+
+
+def bind_config(url):
+    """SQLALCHEMY_BINDS entry for the replica, with the same engine profile as the primary"""
+    return dict(engine_options(url), url=url)
+
+
+def install(app):
+    """Add the replica bind and write marking when DATABASE_REPLICA_URL is set (call before db.init_app)"""
+    url = replica_url()
+    if not url:
+        return
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds.setdefault(REPLICA_BIND, bind_config(url))
+    app.after_request(_mark_write)
+
+
+def copy_sqlite():
+    """Snapshot a SQLite primary into a SQLite replica, standing in for replication when testing locally"""
+    primary, replica = db.engines[None], db.engines[REPLICA_BIND]
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise SystemExit('❌ copy needs SQLite primary and replica databases')
+    _upsert(HEARTBEAT, datetime.utcnow())
+    source, target = sqlite3.connect(primary.url.database), sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == '__main__':
+    from app import app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    with app.app_context():
+        if not enabled():
+            print('❌ DATABASE_REPLICA_URL is not set')
+            raise SystemExit(1)
+        if command == 'copy':
+            copy_sqlite()
+            print(f"✅ Copied {db.engines[None].url.database} to {db.engines[REPLICA_BIND].url.database}")
+        elif command == 'status':
+            try:
+                lag = measure_lag()
+            except Exception as e:
+                print(f"❌ Could not read the replica's lag: {e}")
+                raise SystemExit(1)
+            state = 'replica' if lag <= REPLICA_MAX_LAG_SECONDS else 'primary (replica too far behind)'
+            print(f"Lag source: {lag_source()}")
+            print(f"Lag: {lag:.2f}s (max {REPLICA_MAX_LAG_SECONDS:g}s); admin reads use the {state}")
+        else:
+            print(__doc__)
+            raise SystemExit(1)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Re-encrypt every Account.encrypted_password under the primary ENCRYPTION_KEY
+
+Rotation steps:
+  1. Generate a new key and prepend it: ENCRYPTION_KEY=<new>,<old>
+  2. Deploy, then run: python rotate_encryption_key.py
+  3. Once it finishes, drop the old key from ENCRYPTION_KEY
+
+Rows are read in keyset chunks (id > last id) and written back with one bulk
+UPDATE and commit per chunk, so the table is never loaded into memory and the
+run can be stopped and restarted at any point.
+
+Usage: python rotate_encryption_key.py [--chunk-size 500] [--pause 0.1]
+"""
+
+import argparse
+import time
+
+from sqlalchemy import select, update
+
+from app import app
+from models import db, Account, rotate_many
+
+
+def rotate_all(chunk_size=500, pause=0.0):
+    rotated = 0
+    last_id = 0
+    with app.app_context():
+        while True:
+            rows = db.session.execute(
+                select(Account.id, Account.encrypted_password)
+                .where(Account.id > last_id, Account.encrypted_password.isnot(None))
+                .order_by(Account.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+
+            tokens = rotate_many([row.encrypted_password for row in rows])
+            db.session.execute(update(Account), [
+                {'id': row.id, 'encrypted_password': token}
+                for row, token in zip(rows, tokens)
+            ])
+            db.session.commit()
+
+            rotated += len(rows)
+            last_id = rows[-1].id
+            print(f"🔄 Rotated {rotated} passwords (last id {last_id})")
+            if pause:
+                time.sleep(pause)
+    return rotated
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-encrypt Instagram passwords under the primary key')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between chunks')
+    args = parser.parse_args()
+
+    total = rotate_all(chunk_size=args.chunk_size, pause=args.pause)
+    print(f"✅ Rotation complete: {total} passwords re-encrypted")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Warmup session scheduler
+
+Each warming account gets 2-3 sessions per day over WARMUP_DAYS, placed in
+jittered windows. Slots are derived from the account id and started_at, so a
+restarted scheduler regenerates exactly the same plan. The plan is shifted by
+the account's paused_seconds, so sessions that fell inside a pause run after
+the resume instead of being skipped.
+
+Only each account's *next* session sits in a min-heap, so the heap holds one
+entry per warming account. pop_due/schedule/resume are O(log n); pause is
+O(1) and leaves a stale heap entry that is skipped when it surfaces (and
+compacted away if stale entries pile up).
+
+Due sessions are queued in warmup_jobs for workers to lease (job_queue.py).
+The run loop discovers pause/resume through the indexed
+Account.status_changed_at column, so it never rescans every account after
+the initial load.
+
+Usage:
+  python scheduler.py [--tick 5]
+"""
+
+import argparse
+import heapq
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from models import WARMUP_DAYS
+
+DAY_SECONDS = 24 * 60 * 60
+# Session windows, as hour offsets into each warmup day
+SESSION_WINDOWS = ((1, 4), (7, 10), (13, 16))
+EPOCH = datetime(1970, 1, 1)
+
+logger = logging.getLogger(__name__)
+
+
+def to_timestamp(dt):
+    return (dt - EPOCH).total_seconds()
+
+
+def generate_session_slots(account_id, started_at):
+    """Timestamps of every warmup session for an account, in order"""
+    rng = random.Random(account_id)
+    start = to_timestamp(started_at)
+    slots = []
+    for day in range(WARMUP_DAYS):
+        # Gentler first and last days, 2-3 sessions in between
+        count = 2 if day in (0, WARMUP_DAYS - 1) else rng.choice((2, 3, 3))
+        windows = sorted(rng.sample(SESSION_WINDOWS, count))
+        for low, high in windows:
+            offset = rng.uniform(low, high) * 3600
+            slots.append(start + day * DAY_SECONDS + offset)
+    return slots
+
+
+class WarmupScheduler:
+    def __init__(self):
+        self._heap = []         # (due_ts, account_id, generation, slot_index)
+        self._plans = {}        # account_id -> (generation, slots)
+        self._generation = 0
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._plans)
+
+    def _push(self, account_id, generation, slots, index):
+        heapq.heappush(self._heap, (slots[index], account_id, generation, index))
+
+    def schedule(self, account_id, started_at, now=None, paused_seconds=0):
+        """Start (or restart) the plan for an account from its next future slot"""
+        if account_id in self._plans:
+            self._stale += 1
+        now = time.time() if now is None else now
+        slots = [ts + (paused_seconds or 0) for ts in generate_session_slots(account_id, started_at)]
+        self._generation += 1
+        index = next((i for i, ts in enumerate(slots) if ts >= now), None)
+        if index is None:
+            self._plans.pop(account_id, None)
+            return False
+        self._plans[account_id] = (self._generation, slots)
+        self._push(account_id, self._generation, slots, index)
+        return True
+
+    resume = schedule
+
+    def pause(self, account_id):
+        """Forget an account's plan; its heap entry is dropped lazily"""
+        if self._plans.pop(account_id, None) is not None:
+            self._stale += 1
+            if self._stale > 1024 and self._stale > len(self._heap) // 2:
+                self._compact()
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap
+                      if self._plans.get(entry[1], (None,))[0] == entry[2]]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def next_due(self):
+        while self._heap:
+            due, account_id, generation, _ = self._heap[0]
+            if self._plans.get(account_id, (None,))[0] == generation:
+                return due
+            heapq.heappop(self._heap)
+            self._stale -= 1
+        return None
+
+    def pop_due(self, now=None, limit=None):
+        """Remove and return (account_id, session_index, due_ts) for sessions due by now"""
+        now = time.time() if now is None else now
+        due_sessions = []
+        while self._heap and self._heap[0][0] <= now:
+            if limit is not None and len(due_sessions) >= limit:
+                break
+            due, account_id, generation, index = heapq.heappop(self._heap)
+            plan = self._plans.get(account_id)
+            if plan is None or plan[0] != generation:
+                self._stale -= 1
+                continue
+            due_sessions.append((account_id, index, due))
+            slots = plan[1]
+            if index + 1 < len(slots):
+                self._push(account_id, generation, slots, index + 1)
+            else:
+                del self._plans[account_id]
+        return due_sessions
+
+
+def dispatch(scheduler, sessions):
+    """Hand due sessions to the worker fleet through the lease queue"""
+    from job_queue import enqueue_jobs
+    queued, dropped = enqueue_jobs(sessions)
+    # Deleted accounts never show up as status changes; forget them here
+    for account_id in dropped:
+        scheduler.pause(account_id)
+    logger.info('%d session(s) due, %d queued', len(sessions), queued)
+
+
+def report_exhausted(account_ids):
+    """Warming accounts with no sessions left are the worker's to complete; flag them rather than guess"""
+    if account_ids:
+        logger.warning('%d warming account(s) have no sessions left to schedule', len(account_ids),
+                       extra={'account_ids': account_ids[:100]})
+
+
+def load_warming_accounts(scheduler, chunk_size=5000):
+    from sqlalchemy import select
+    from models import db, Account
+
+    last_id, loaded = 0, 0
+    now = time.time()
+    while True:
+        rows = db.session.execute(
+            select(Account.id, Account.started_at, Account.paused_seconds)
+            .where(Account.id > last_id, Account.status == 'warming')
+            .order_by(Account.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return loaded
+        exhausted = []
+        for row in rows:
+            if not row.started_at:
+                continue
+            if scheduler.schedule(row.id, row.started_at, now, row.paused_seconds):
+                loaded += 1
+            else:
+                exhausted.append(row.id)
+        last_id = rows[-1].id
+        report_exhausted(exhausted)
+
+
+def apply_status_changes(scheduler, since):
+    """Pause/resume accounts whose status changed after `since`; returns the new watermark"""
+    from sqlalchemy import select
+    from models import db, Account
+
+    rows = db.session.execute(
+        select(Account.id, Account.status, Account.started_at, Account.paused_seconds,
+               Account.status_changed_at)
+        .where(Account.status_changed_at > since)
+        .order_by(Account.status_changed_at)
+    ).all()
+    now = time.time()
+    exhausted = []
+    for row in rows:
+        if row.status == 'warming' and row.started_at:
+            if not scheduler.resume(row.id, row.started_at, now, row.paused_seconds):
+                exhausted.append(row.id)
+        else:
+            scheduler.pause(row.id)
+        since = max(since, row.status_changed_at)
+    report_exhausted(exhausted)
+    return since
+
+
+def run(tick=5.0):
+    from models import db
+
+    scheduler = WarmupScheduler()
+    # Start the watermark slightly in the past so changes racing the load aren't missed
+    watermark = datetime.utcnow() - timedelta(seconds=tick)
+    logger.info('Scheduler loaded %d warming account(s)', load_warming_accounts(scheduler))
+    sessions = []
+    while True:
+        # A failed pass is logged and retried next tick; sessions that couldn't
+        # be queued are kept and tried again with the next due batch
+        try:
+            watermark = apply_status_changes(scheduler, watermark)
+            sessions += scheduler.pop_due()
+            if sessions:
+                dispatch(scheduler, sessions)
+                sessions = []
+        except Exception:
+            db.session.rollback()
+            logger.exception('Scheduler pass failed; retrying next tick')
+        finally:
+            db.session.remove()
+        time.sleep(tick)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    parser = argparse.ArgumentParser(description='Run the warmup session scheduler')
+    parser.add_argument('--tick', type=float, default=5.0, help='seconds between scheduling passes')
+    args = parser.parse_args()
+
+    with app.app_context():
+        run(tick=args.tick)
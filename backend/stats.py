@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+
+from sqlalchemy import select, func, case, true
+
+from models import db, User, Order, Account
+
+# Admin dashboard stats are computed in one aggregate statement and kept as an
+# in-process snapshot. Routes that change order/account status call
+# invalidate_stats(); the TTL bounds staleness across gunicorn workers.
+STATS_TTL_SECONDS = float(os.getenv('ADMIN_STATS_TTL', '15'))
+
+_lock = threading.Lock()
+_snapshot = None
+_snapshot_expires = 0.0
+_generation = 0
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def compute_stats():
+    """Compute dashboard stats with a single SELECT over three one-row aggregates"""
+    user_stats = select(
+        _count_if(User.role == 'client').label('total_users')
+    ).subquery()
+    order_stats = select(
+        func.count(Order.id).label('total_orders'),
+        _count_if(Order.status == 'paid').label('paid_orders'),
+        func.coalesce(func.sum(case((Order.status == 'paid', Order.amount), else_=0)), 0).label('paid_amount')
+    ).subquery()
+    account_stats = select(
+        _count_if(Account.status == 'warming').label('active_accounts'),
+        _count_if(Account.status == 'completed').label('completed_accounts')
+    ).subquery()
+
+    # Each subquery is a single row, so the cross join is one row too
+    one_row = user_stats.join(order_stats, true()).join(account_stats, true())
+    row = db.session.execute(select(user_stats, order_stats, account_stats).select_from(one_row)).one()
+    return {
+        'total_users': int(row.total_users),
+        'total_orders': int(row.total_orders),
+        'paid_orders': int(row.paid_orders),
+        'total_revenue': int(row.paid_amount) / 100,
+        'active_accounts': int(row.active_accounts),
+        'completed_accounts': int(row.completed_accounts)
+    }
+
+
+def get_stats():
+    """Return the cached stats snapshot, recomputing it once the TTL has passed"""
+    global _snapshot, _snapshot_expires
+    now = time.monotonic()
+    with _lock:
+        if _snapshot is not None and now < _snapshot_expires:
+            return _snapshot
+        generation = _generation
+
+    snapshot = compute_stats()
+
+    with _lock:
+        # Don't store a snapshot that an invalidation raced past
+        if generation == _generation:
+            _snapshot = snapshot
+            _snapshot_expires = time.monotonic() + STATS_TTL_SECONDS
+    return snapshot
+
+
+def invalidate_stats():
+    """Drop the cached snapshot after an order or account changes status"""
+    global _snapshot, _generation
+    with _lock:
+        _snapshot = None
+        _generation += 1
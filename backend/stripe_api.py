@@ -1,15 +1,104 @@
 import stripe
 import os
+import logging
+import hashlib
+import hmac
+import threading
+import time
 
-print(f"Stripe module: {stripe}")
-print(f"Stripe version: {getattr(stripe, '__version__', 'Unknown')}")
-print(f"Stripe.checkout: {getattr(stripe, 'checkout', 'NOT FOUND')}")
-print(f"Dir stripe: {dir(stripe)[:10]}...")  # First 10 attributes
+import requests
+from requests.adapters import HTTPAdapter
 
-stripe_key = os.getenv('STRIPE_SECRET_KEY')
-print(f"Stripe key loaded: {stripe_key[:20]}..." if stripe_key else "No Stripe key found!")
+import metrics
 
-stripe.api_key = stripe_key
+logger = logging.getLogger(__name__)
+
+stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+# Log library/key details at startup (and the stripe library's own request logs)
+STRIPE_DEBUG = os.getenv('STRIPE_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+# Point at a local stub (benchmarks/stripe_stub.py) for offline load tests
+if os.getenv('STRIPE_API_BASE'):
+    stripe.api_base = os.getenv('STRIPE_API_BASE')
+
+# HTTP client: pooled keep-alive connections, bounded timeouts and retries.
+# Stripe retries connection errors, 409s and 5xx itself with jittered
+# exponential backoff and idempotency keys; we only bound how many times.
+STRIPE_CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', '3'))
+STRIPE_READ_TIMEOUT = float(os.getenv('STRIPE_READ_TIMEOUT', '10'))
+STRIPE_MAX_RETRIES = int(os.getenv('STRIPE_MAX_RETRIES', '2'))
+STRIPE_POOL_SIZE = int(os.getenv('STRIPE_POOL_SIZE', '10'))
+
+# Circuit breaker: after STRIPE_BREAKER_FAILURES consecutive transport/5xx
+# failures, fail fast for STRIPE_BREAKER_RESET seconds before trying again
+STRIPE_BREAKER_FAILURES = int(os.getenv('STRIPE_BREAKER_FAILURES', '5'))
+STRIPE_BREAKER_RESET = float(os.getenv('STRIPE_BREAKER_RESET', '30'))
+
+# stripe<8 keeps exceptions in stripe.error, newer releases at the top level
+_errors = getattr(stripe, 'error', stripe)
+_RequestsClient = getattr(stripe, 'RequestsClient', None) or stripe.http_client.RequestsClient
+
+# Failures that say Stripe itself is unreachable or unhealthy, not that our request was bad
+TRANSIENT_ERRORS = (_errors.APIConnectionError, _errors.APIError, _errors.RateLimitError)
+
+def build_http_client():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=STRIPE_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return _RequestsClient(timeout=(STRIPE_CONNECT_TIMEOUT, STRIPE_READ_TIMEOUT), session=session)
+
+stripe.default_http_client = build_http_client()
+stripe.max_network_retries = STRIPE_MAX_RETRIES
+
+
+class StripeUnavailable(Exception):
+    """Raised without calling Stripe while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise StripeUnavailable('Payment provider temporarily unavailable, please retry shortly')
+            # Half-open: let this call through as a probe; a failure re-opens
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        self.before_call()
+        try:
+            with metrics.timer('stripe'):
+                result = fn(*args, **kwargs)
+        except TRANSIENT_ERRORS:
+            self.record_failure()
+            raise
+        except _errors.StripeError:
+            # Stripe answered (e.g. InvalidRequestError), so it is reachable: close the breaker
+            self.record_success()
+            raise
+        self.record_success()
+        return result
+
+breaker = CircuitBreaker(STRIPE_BREAKER_FAILURES, STRIPE_BREAKER_RESET)
 
 PRICES = {
     'one_time': os.getenv('PRICE_ONE_TIME'),
@@ -22,14 +111,11 @@ def create_checkout_session(plan, user_email, success_url, cancel_url):
     if not price_id:
         raise ValueError(f"Invalid plan: {plan}")
     
-    print(f"Creating checkout session for plan: {plan}")
-    print(f"Price ID: {price_id}")
-    print(f"User email: {user_email}")
-    
     mode = 'payment' if plan == 'one_time' else 'subscription'
     
     try:
-        session = stripe.checkout.Session.create(
+        return breaker.call(
+            stripe.checkout.Session.create,
             payment_method_types=['card'],
             line_items=[{'price': price_id, 'quantity': 1}],
             mode=mode,
@@ -38,22 +124,30 @@ def create_checkout_session(plan, user_email, success_url, cancel_url):
             customer_email=user_email,
             metadata={'plan': plan}
         )
-        print(f"✅ Checkout session created: {session.id}")
-        return session
     except Exception as e:
-        print(f"❌ Stripe error: {str(e)}")
+        logger.warning('Stripe checkout session failed', extra={'plan': plan, 'error': str(e)})
         raise
 
 def get_session(session_id):
-    return stripe.checkout.Session.retrieve(session_id)
+    return breaker.call(stripe.checkout.Session.retrieve, session_id)
 
 def create_portal_session(customer_id, return_url):
-    session = stripe.billing_portal.Session.create(
+    session = breaker.call(
+        stripe.billing_portal.Session.create,
         customer=customer_id,
         return_url=return_url
     )
     return session
 
+def sign_payload(payload, secret=None, timestamp=None):
+    """Build a Stripe-Signature header for a payload, for local webhook testing"""
+    secret = secret or os.getenv('STRIPE_WEBHOOK_SECRET')
+    timestamp = int(timestamp or time.time())
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    signature = hmac.new(secret.encode('utf-8'), f'{timestamp}.{payload}'.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
 def verify_webhook_signature(payload, sig_header):
     webhook_secret = os.getenv('STRIPE_WEBHOOK_SECRET')
     try:
@@ -61,3 +155,15 @@ def verify_webhook_signature(payload, sig_header):
         return event
     except:
         return None
+
+def print_diagnostics():
+    """Log Stripe configuration problems; library/key details only with STRIPE_DEBUG (called from bootstrap)"""
+    if STRIPE_DEBUG:
+        logging.getLogger('stripe').setLevel(logging.DEBUG)
+        logger.info('Stripe version %s', getattr(stripe, 'VERSION', getattr(stripe, '__version__', 'Unknown')))
+        logger.info(f'Stripe key loaded: {stripe.api_key[:7]}...' if stripe.api_key else 'No Stripe key found!')
+    if not stripe.api_key:
+        logger.warning('STRIPE_SECRET_KEY is not set')
+    missing = [plan for plan, price_id in PRICES.items() if not price_id]
+    if missing:
+        logger.warning('Missing Stripe price IDs for: %s', ', '.join(missing))
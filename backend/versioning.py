@@ -0,0 +1,48 @@
+from sqlalchemy import event, select, update
+
+from models import db, User, Order, Account
+
+# Per-user change version behind the client ETags in app.py. Any flush that
+# adds, changes or deletes a user's Account or Order rows (or the User row
+# itself) bumps users.data_version in the same transaction, so a poll can
+# compare versions with one primary-key lookup instead of reloading the rows.
+# Code that writes accounts/orders with bulk SQL calls bump_data_version().
+TRACKED = (Account, Order)
+users = User.__table__
+
+
+def _bump_statement(user_ids):
+    return (update(users)
+            .where(users.c.id.in_(sorted(user_ids)))
+            .values(data_version=users.c.data_version + 1))
+
+
+def bump_data_version(user_ids):
+    """Mark these users' data as changed (joins the current transaction)"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        db.session.execute(_bump_statement(user_ids))
+
+
+def data_version(user_id):
+    """Current version for a user, or None if the user doesn't exist"""
+    return db.session.execute(select(User.data_version).where(User.id == user_id)).scalar()
+
+
+def _bump_flushed(session, flush_context):
+    user_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, TRACKED):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, User) and obj not in session.new and session.is_modified(obj):
+            user_ids.add(obj.id)
+    user_ids.discard(None)
+    if user_ids:
+        # Core statement on the flush's own connection: no autoflush, same transaction
+        session.connection().execute(_bump_statement(user_ids))
+
+
+def install(session):
+    """Hook data_version bumping into a (scoped) session's flush"""
+    if not event.contains(session, 'after_flush', _bump_flushed):
+        event.listen(session, 'after_flush', _bump_flushed)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Apply queued Stripe webhook events
+
+/api/webhook/stripe only verifies the signature and stores the event in
+stripe_events. This consumer claims pending events in batches and applies
+them to orders. Several consumers can run at once: a batch is claimed with a
+single guarded UPDATE, so each event is applied by exactly one of them, and
+the unique event_id means redeliveries are never queued twice. Events left
+'processing' by a crashed consumer are reclaimed after CLAIM_TIMEOUT_SECONDS.
+
+Stripe doesn't order deliveries, so a subscription or invoice event can
+arrive before the checkout.session.completed that links its subscription to
+an order. Such events, like ones whose handler raised, go back to 'pending'
+and are retried RETRY_DELAY_SECONDS later, up to MAX_ATTEMPTS times; an
+event whose order never shows up ends 'ignored'.
+
+Usage:
+  python webhook_worker.py            # run forever
+  python webhook_worker.py --once     # drain the queue and exit
+  options: --batch-size 100 --interval 1.0
+"""
+
+import argparse
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, or_, and_
+
+from models import db, Order, StripeEvent
+from stats import invalidate_stats
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+CLAIM_TIMEOUT_SECONDS = 300
+RETRY_DELAY_SECONDS = 60
+
+# Stripe subscription status -> Order.status
+SUBSCRIPTION_STATUSES = {
+    'active': 'paid',
+    'trialing': 'paid',
+    'past_due': 'past_due',
+    'unpaid': 'past_due',
+    'incomplete': 'pending',
+    'incomplete_expired': 'cancelled',
+    'canceled': 'cancelled',
+    'paused': 'paused'
+}
+
+
+class OrderNotFound(Exception):
+    """The event's subscription isn't linked to an order (yet)"""
+
+
+def order_for_subscription(subscription_id):
+    if not subscription_id:
+        return None
+    order = Order.query.filter_by(stripe_subscription_id=subscription_id).first()
+    if not order:
+        raise OrderNotFound(f'No order for subscription {subscription_id}')
+    return order
+
+
+def handle_checkout_completed(obj):
+    order = Order.query.filter_by(stripe_session_id=obj['id']).first()
+    if not order:
+        return False
+    order.status = 'paid'
+    order.stripe_payment_id = obj.get('payment_intent') or order.stripe_payment_id
+    order.stripe_customer_id = obj.get('customer') or order.stripe_customer_id
+    order.stripe_subscription_id = obj.get('subscription') or order.stripe_subscription_id
+    return True
+
+
+def handle_subscription_changed(obj):
+    order = order_for_subscription(obj.get('id'))
+    status = SUBSCRIPTION_STATUSES.get(obj.get('status'))
+    if not order or not status:
+        return False
+    order.status = status
+    return True
+
+
+def handle_subscription_deleted(obj):
+    order = order_for_subscription(obj.get('id'))
+    if not order:
+        return False
+    order.status = 'cancelled'
+    return True
+
+
+def handle_invoice_paid(obj):
+    order = order_for_subscription(obj.get('subscription'))
+    if not order:
+        return False
+    order.status = 'paid'
+    order.stripe_payment_id = obj.get('payment_intent') or order.stripe_payment_id
+    return True
+
+
+def handle_invoice_failed(obj):
+    order = order_for_subscription(obj.get('subscription'))
+    if not order:
+        return False
+    order.status = 'past_due'
+    return True
+
+
+HANDLERS = {
+    'checkout.session.completed': handle_checkout_completed,
+    'customer.subscription.created': handle_subscription_changed,
+    'customer.subscription.updated': handle_subscription_changed,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'invoice.paid': handle_invoice_paid,
+    'invoice.payment_succeeded': handle_invoice_paid,
+    'invoice.payment_failed': handle_invoice_failed
+}
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """Atomically mark up to batch_size claimable events as ours and return them"""
+    now = datetime.utcnow()
+    claimable = or_(
+        and_(StripeEvent.status == 'pending',
+             or_(StripeEvent.claimed_at.is_(None),
+                 StripeEvent.claimed_at < now - timedelta(seconds=RETRY_DELAY_SECONDS))),
+        and_(StripeEvent.status == 'processing',
+             StripeEvent.claimed_at < now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS))
+    )
+    ids = db.session.execute(
+        select(StripeEvent.id).where(claimable).order_by(StripeEvent.id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return []
+
+    # The claimable guard is re-checked by the UPDATE, so rows another consumer
+    # took between the SELECT and here are skipped
+    claim = uuid.uuid4().hex
+    db.session.execute(
+        update(StripeEvent)
+        .where(StripeEvent.id.in_(ids), claimable)
+        .values(status='processing', claimed_by=claim, claimed_at=now,
+                attempts=StripeEvent.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return StripeEvent.query.filter_by(claimed_by=claim, status='processing').order_by(StripeEvent.id).all()
+
+
+def apply_event(event):
+    handler = HANDLERS.get(event.type)
+    if handler is None:
+        return 'ignored'
+    data = json.loads(event.payload)
+    return 'done' if handler(data['data']['object']) else 'ignored'
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Claim and apply one batch in a single transaction. Returns the number of events handled."""
+    events = claim_batch(batch_size)
+    for event in events:
+        savepoint = db.session.begin_nested()
+        try:
+            status = apply_event(event)
+            savepoint.commit()
+            event.status = status
+            event.last_error = None
+            event.processed_at = datetime.utcnow()
+        except OrderNotFound as e:
+            savepoint.rollback()
+            event.last_error = str(e)
+            if event.attempts >= MAX_ATTEMPTS:
+                event.status = 'ignored'
+                event.processed_at = datetime.utcnow()
+            else:
+                event.status = 'pending'
+        except Exception as e:
+            savepoint.rollback()
+            event.last_error = str(e)
+            event.status = 'failed' if event.attempts >= MAX_ATTEMPTS else 'pending'
+            logger.error('Stripe event failed', extra={'event_id': event.event_id, 'event_type': event.type,
+                                                       'attempts': event.attempts, 'error': str(e)})
+    if events:
+        db.session.commit()
+        invalidate_stats()
+    return len(events)
+
+
+def run(batch_size=BATCH_SIZE, interval=1.0, once=False):
+    while True:
+        handled = process_batch(batch_size)
+        if handled:
+            logger.info('Applied %d Stripe event(s)', handled)
+            continue
+        if once:
+            return
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    parser = argparse.ArgumentParser(description='Apply queued Stripe webhook events')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds to sleep when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='drain the queue and exit')
+    args = parser.parse_args()
+
+    with app.app_context():
+        run(batch_size=args.batch_size, interval=args.interval, once=args.once)
@@ -7,6 +7,10 @@ const AdminDashboard = () => {
   const [users, setUsers] = useState([]);
   const [orders, setOrders] = useState([]);
   const [accounts, setAccounts] = useState([]);
+  const [ordersCursor, setOrdersCursor] = useState(null);
+  const [accountsCursor, setAccountsCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('orders');
   const [searchTerm, setSearchTerm] = useState('');
@@ -48,6 +52,18 @@ const AdminDashboard = () => {
     .catch(() => navigate('/admin/login'));
   }, [navigate]);
 
+  // Orders and accounts are paginated newest first; X-Next-Cursor is set while more pages exist
+  const PAGE_SIZE = 100;
+  const fetchPage = async (path, token, cursor = null) => {
+    const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+    if (cursor) params.set('after', cursor);
+    const response = await fetch(`${API_URL}${path}?${params}`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+    if (!response.ok) throw new Error(`${path} returned ${response.status}`);
+    return { rows: await response.json(), next: response.headers.get('X-Next-Cursor') };
+  };
+
   const loadData = () => {
     const token = localStorage.getItem('token');
     
@@ -55,17 +71,19 @@ const AdminDashboard = () => {
       fetch(`${API_URL}/api/admin/users`, {
         headers: { 'Authorization': `Bearer ${token}` }
       }).then(r => r.json()),
-      fetch(`${API_URL}/api/admin/orders`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      }).then(r => r.json()),
-      fetch(`${API_URL}/api/admin/accounts`, {
+      fetchPage('/api/admin/orders', token),
+      fetchPage('/api/admin/accounts', token),
+      fetch(`${API_URL}/api/admin/stats`, {
         headers: { 'Authorization': `Bearer ${token}` }
       }).then(r => r.json())
     ])
-    .then(([usersData, ordersData, accountsData]) => {
+    .then(([usersData, ordersPage, accountsPage, statsData]) => {
       setUsers(usersData);
-      setOrders(ordersData);
-      setAccounts(accountsData);
+      setOrders(ordersPage.rows);
+      setOrdersCursor(ordersPage.next);
+      setAccounts(accountsPage.rows);
+      setAccountsCursor(accountsPage.next);
+      setStats(statsData);
       setLoading(false);
     })
     .catch(err => {
@@ -74,6 +92,36 @@ const AdminDashboard = () => {
     });
   };
 
+  const loadMore = async (kind) => {
+    const token = localStorage.getItem('token');
+    setLoadingMore(true);
+    try {
+      if (kind === 'orders') {
+        const page = await fetchPage('/api/admin/orders', token, ordersCursor);
+        setOrders(current => current.concat(page.rows));
+        setOrdersCursor(page.next);
+      } else {
+        const page = await fetchPage('/api/admin/accounts', token, accountsCursor);
+        setAccounts(current => current.concat(page.rows));
+        setAccountsCursor(page.next);
+      }
+    } catch (err) {
+      console.error('Error loading more:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const renderLoadMore = (kind, cursor) => cursor ? (
+    <button
+      onClick={() => loadMore(kind)}
+      disabled={loadingMore}
+      className="mt-6 w-full px-6 py-3 bg-white/5 border border-white/10 rounded-lg font-semibold hover:bg-white/10 transition disabled:opacity-50"
+    >
+      {loadingMore ? 'Loading...' : 'Load more'}
+    </button>
+  ) : null;
+
   const handleLogout = () => {
     localStorage.removeItem('token');
     navigate('/');
@@ -442,14 +490,14 @@ const AdminDashboard = () => {
               <ShoppingBag className="text-green-400" size={24} />
               <h3 className="text-lg font-semibold">Total Orders</h3>
             </div>
-            <div className="text-3xl font-bold">{orders.length}</div>
+            <div className="text-3xl font-bold">{stats ? stats.total_orders : orders.length}</div>
           </div>
           <div className="p-6 bg-white/5 backdrop-blur-md border border-white/10 rounded-xl">
             <div className="flex items-center gap-3 mb-2">
               <Instagram className="text-pink-400" size={24} />
               <h3 className="text-lg font-semibold">Active Accounts</h3>
             </div>
-            <div className="text-3xl font-bold">{accounts.filter(a => a.status === 'warming').length}</div>
+            <div className="text-3xl font-bold">{stats ? stats.active_accounts : accounts.filter(a => a.status === 'warming').length}</div>
           </div>
         </div>
 
@@ -462,7 +510,7 @@ const AdminDashboard = () => {
                 : 'text-gray-400 hover:text-white'
             }`}
           >
-            Orders ({orders.length})
+            Orders ({orders.length}{ordersCursor ? '+' : ''})
           </button>
           <button
             onClick={() => setActiveTab('accounts')}
@@ -472,7 +520,7 @@ const AdminDashboard = () => {
                 : 'text-gray-400 hover:text-white'
             }`}
           >
-            IG Accounts ({accounts.length})
+            IG Accounts ({accounts.length}{accountsCursor ? '+' : ''})
           </button>
           <button
             onClick={() => setActiveTab('users')}
@@ -550,6 +598,7 @@ const AdminDashboard = () => {
                 </div>
               ))}
             </div>
+            {renderLoadMore('orders', ordersCursor)}
           </>
         )}
 
@@ -645,6 +694,7 @@ const AdminDashboard = () => {
                 </div>
               ))}
             </div>
+            {renderLoadMore('accounts', accountsCursor)}
           </>
         )}
 